@@ -27,23 +27,35 @@ from locator import LocatorAvito
 from xlsx_service import XLSXHandler
 from dotenv import load_dotenv
 from utils.database import get_async_session
-from utils.models import Client
+from utils.lookup_cache import LookupCacheStats, get_cached_lookup, store_lookup
+from utils.models import Client, LookupCache
 
 load_dotenv()
 
 async def get_commercial_addresses(report_id: int, session: AsyncSession) -> List[dict]:
-    """Получение адресов коммерческих клиентов из базы данных"""
-    query = select(Client.id, Client.address).where(
+    """
+    Получение адресов коммерческих клиентов из базы данных.
+    Клиенты одного здания (building_key) объединяются в один адрес для поиска,
+    key — ключ здания в кэше проверок (lookup_cache)
+    """
+    query = select(Client.id, Client.address, Client.building_key).where(
         Client.report_id == report_id,
         #Client.is_commercial == True,
         Client.address.isnot(None)
-    )
+    ).order_by(Client.id)
     result = await session.execute(query)
-    return [{"id": row[0], "address": row[1]} for row in result if row[1]]
-
-async def update_client_avito_link(client_id: int, avito_link: str, session: AsyncSession):
-    """Обновление ссылки на Авито для клиента"""
-    query = update(Client).where(Client.id == client_id).values(
+    buildings = {}
+    for client_id, address, building_key in result:
+        if not address:
+            continue
+        key = building_key or address
+        building = buildings.setdefault(key, {"id": client_id, "ids": [], "address": address, "key": key})
+        building["ids"].append(client_id)
+    return list(buildings.values())
+
+async def update_client_avito_link(client_ids: List[int], avito_link: str, session: AsyncSession):
+    """Обновление ссылки на Авито для клиентов одного здания"""
+    query = update(Client).where(Client.id.in_(client_ids)).values(
         frod_avito=avito_link,
         frod_procentage=Client.frod_procentage + 30,
         frod_state="Требует внимания"
@@ -95,6 +107,11 @@ class AvitoParse:
         self.addresses = []  # Инициализируем пустой список адресов
         self.current_address_index = 0
         self.current_client_id = None
+        self.current_client_ids = []
+        self.current_avito_link = None  # найденное для текущего адреса объявление
+        self.current_avito_evidence = None  # адрес из найденного объявления
+        self.lookup_failed = False  # была ли ошибка при поиске текущего адреса
+        self.lookup_stats = LookupCacheStats()
         self.last_ip_change = 0  # Время последней смены IP
         self.ip_change_interval = 300  # Интервал смены IP в секундах (5 минут)
 
@@ -346,6 +363,9 @@ class AvitoParse:
             
             # Если адрес совпадает, сохраняем ссылку в БД
             if self.current_address.lower() in geo.lower():
+                if self.current_avito_link is None:
+                    self.current_avito_link = data.get("url")
+                    self.current_avito_evidence = geo
                 asyncio.run(self.save_avito_link(data.get("url")))
                 return data
             return None
@@ -406,9 +426,24 @@ class AvitoParse:
                 return
 
             self.current_client_id = address_data["id"]
+            self.current_client_ids = address_data["ids"]
             current_address = address_data["address"]
             logger.info(f"Обработка адреса: {current_address} (ID клиента: {self.current_client_id})")
+
+            # Здание, проверенное недавно, повторно на Авито не ищем
+            cached = asyncio.run(self.load_cached_lookup(address_data["key"]))
+            if cached is not None:
+                self.lookup_stats.hit("avito")
+                logger.info(f"Адрес {current_address} уже проверен {cached.checked_at:%d.%m.%Y}, результат из кэша")
+                if cached.result_url:
+                    asyncio.run(self.save_avito_link(cached.result_url))
+                continue
+            self.lookup_stats.miss("avito")
+
             self.current_address = current_address
+            self.current_avito_link = None
+            self.current_avito_evidence = None
+            self.lookup_failed = False
             self.xlsx_handler = XLSXHandler(self.__get_file_title())
             
             try:
@@ -417,9 +452,15 @@ class AvitoParse:
                 logger.error(f"Ошибка при обработке адреса {current_address}: {err}")
                 continue
 
+            # Пустой результат сохраняется, только если поиск прошёл без ошибок и не был прерван
+            if not self.lookup_failed and not self.stop_event.is_set():
+                asyncio.run(self.save_lookup(address_data["key"], self.current_avito_link, self.current_avito_evidence))
+
             # Пауза между адресами
             time.sleep(random.randint(5, 10))
 
+        logger.info(f"Кэш проверок, попаданий по зданиям: {self.lookup_stats.summary()}")
+
     def _parse_single_url(self):
         """Вспомогательный метод для парсинга одного URL"""
         for _url in self.url_list:
@@ -461,6 +502,7 @@ class AvitoParse:
                     logger.info("Парсинг завершен")
                     return
                 except Exception as err:
+                    self.lookup_failed = True
                     logger.debug(f"Ошибка: {err}")
 
     def check_stop_event(self):
@@ -514,12 +556,33 @@ class AvitoParse:
 
         async for session in get_async_session():
             try:
-                await update_client_avito_link(self.current_client_id, avito_link, session)
-                logger.info(f"Ссылка на Авито сохранена для клиента {self.current_client_id}")
+                await update_client_avito_link(self.current_client_ids, avito_link, session)
+                logger.info(f"Ссылка на Авито сохранена для клиентов {self.current_client_ids}")
             except Exception as e:
                 logger.error(f"Ошибка при сохранении ссылки на Авито: {e}")
             break
 
+    async def load_cached_lookup(self, key: str) -> Optional[LookupCache]:
+        """Действующий результат поиска здания на Авито из кэша проверок"""
+        cached = None
+        async for session in get_async_session():
+            try:
+                cached = await get_cached_lookup(session, "avito", key)
+            except Exception as e:
+                logger.error(f"Ошибка при чтении кэша проверок: {e}")
+            break
+        return cached
+
+    async def save_lookup(self, key: str, avito_link: Optional[str], evidence: Optional[str]):
+        """Сохранение результата поиска здания на Авито в кэш проверок"""
+        async for session in get_async_session():
+            try:
+                await store_lookup(session, "avito", key, avito_link, evidence)
+                await session.commit()
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении результата в кэш проверок: {e}")
+            break
+
 if __name__ == '__main__':
     import configparser
     import json
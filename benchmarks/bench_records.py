@@ -0,0 +1,79 @@
+"""
+Бенчмарк преобразования DataFrame клиентов в записи для записи в БД:
+прежний вариант через iterrows против колоночного frame_to_records.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_records --rows 100000
+"""
+import argparse
+import logging
+import os
+import time
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from data_cleaning.parse_report import frame_to_records, frame_to_rows, parse_report_file, SERVICE_COLUMNS
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), "..", "data_cleaning", "dataset_train.json")
+
+
+def iterrows_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Прежняя построчная конвертация из parse_report_file"""
+    result = []
+    for _, row in df.iterrows():
+        record = {}
+        for col in df.columns:
+            if col in SERVICE_COLUMNS:
+                continue
+            value = row[col]
+            if pd.isna(value):
+                record[col] = None
+            elif col in ['people_count', 'rooms_count']:
+                record[col] = int(value) if value is not None else None
+            elif col in ['home_area', 'season_index']:
+                record[col] = float(value) if value is not None else None
+            else:
+                record[col] = value
+        result.append(record)
+    return result
+
+
+def build_frame(rows: int) -> pd.DataFrame:
+    """DataFrame нужного размера из размноженного обучающего набора"""
+    records = parse_report_file(DATASET_PATH)
+    df = pd.DataFrame(records)
+    df = pd.concat([df] * (rows // len(df) + 1), ignore_index=True).head(rows)
+    df['id'] = range(len(df))
+    df['region_group'] = df['region'].fillna('Unknown')
+    return df
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="количество клиентов")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    df = build_frame(args.rows)
+    assert iterrows_to_records(df.head(1000)) == frame_to_records(df.head(1000))
+
+    columns = [col for col in df.columns if col not in SERVICE_COLUMNS]
+    legacy = timed(iterrows_to_records, df)
+    records = timed(frame_to_records, df)
+    rows = timed(frame_to_rows, df, columns)
+
+    print(f"клиентов: {len(df)}")
+    print(f"iterrows:         {legacy:8.3f} с  ({len(df) / legacy:12.0f} строк/с)")
+    print(f"frame_to_records: {records:8.3f} с  ({len(df) / records:12.0f} строк/с)  x{legacy / records:.1f}")
+    print(f"frame_to_rows:    {rows:8.3f} с  ({len(df) / rows:12.0f} строк/с)  x{legacy / rows:.1f}")
+
+
+if __name__ == "__main__":
+    main()
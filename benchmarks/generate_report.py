@@ -0,0 +1,157 @@
+"""
+Генератор синтетических отчётов для бенчмарков: JSON в том же формате,
+что и выгрузки биллинга (accountId, address, buildingType, roomsCount,
+residentsCount, totalArea, consumption по месяцам).
+
+В данных есть то, с чем сталкивается парсер на реальных файлах:
+пропущенные поля и месяцы, числа строками с запятой вместо точки,
+разные формы записи адресов и квартиры в многоквартирных домах.
+
+Запуск из корня репозитория:
+    python -m benchmarks.generate_report --rows 100000 --output report.json
+"""
+import argparse
+import json
+import os
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+from faker import Faker
+
+BUILDING_TYPES = ['Частный', 'Многоквартирный', 'Прочий']
+BUILDING_WEIGHTS = [0.6, 0.3, 0.1]
+SETTLEMENT_TYPES = ['г', 'с', 'село', 'ст-ца', 'п', 'ПОС.', 'пгт', 'х.']
+STREET_TYPES = ['ул', 'ул.', 'улица', 'пер', 'пр-кт', 'проезд']
+# Сезонность потребления: зимой больше, летом меньше
+SEASONALITY = np.array([1.4, 1.3, 1.1, 0.9, 0.8, 0.8, 0.9, 0.9, 0.8, 0.9, 1.1, 1.3])
+
+MISSING_FIELD_RATE = 0.1  # доля пропусков в числовых полях
+MISSING_MONTH_RATE = 0.08  # доля пропущенных месяцев потребления
+COMMA_DECIMAL_RATE = 0.2  # доля чисел, записанных строкой с запятой
+COMMERCIAL_RATE = 0.3  # доля клиентов с коммерческим потреблением
+GENERATE_CHUNK_SIZE = 10000
+
+
+class ReportGenerator:
+    """
+    Генерирует клиентов пачками: справочники улиц и населённых пунктов
+    создаются через Faker один раз, а значения полей — векторно через numpy,
+    поэтому генерация миллиона клиентов занимает секунды, а не минуты
+    """
+
+    def __init__(self, seed: int = 42, settlements: int = 300, streets: int = 1500):
+        self.rng = np.random.default_rng(seed)
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        self.districts = [f"р-н {fake.city_name()}" for _ in range(40)]
+        self.settlements = [fake.city_name() for _ in range(settlements)]
+        self.streets = [fake.street_title() for _ in range(streets)]
+
+    def _addresses(self, building: np.ndarray) -> List[str]:
+        """Адреса для пачки клиентов: все случайные выборы делаются векторно"""
+        rng = self.rng
+        n = len(building)
+        has_district = rng.random(n) < 0.7
+        district = rng.integers(len(self.districts), size=n)
+        settlement_type = rng.integers(len(SETTLEMENT_TYPES), size=n)
+        settlement = rng.integers(len(self.settlements), size=n)
+        street_type = rng.integers(len(STREET_TYPES), size=n)
+        street = rng.integers(len(self.streets), size=n)
+        house = rng.integers(1, 200, size=n)
+        letter = np.where(rng.random(n) < 0.1, rng.integers(3, size=n), -1)
+        apartment = rng.integers(1, 300, size=n)
+        is_flat = building == BUILDING_TYPES.index('Многоквартирный')
+
+        addresses = []
+        for i in range(n):
+            parts = ["Краснодарский край"]
+            if has_district[i]:
+                parts.append(self.districts[district[i]])
+            parts.append(f"{SETTLEMENT_TYPES[settlement_type[i]]} {self.settlements[settlement[i]]}")
+            parts.append(f"{STREET_TYPES[street_type[i]]} {self.streets[street[i]]}")
+            parts.append(f"д. {house[i]}" + (f" {'абв'[letter[i]]}" if letter[i] >= 0 else ""))
+            if is_flat[i]:
+                parts.append(f"кв. {apartment[i]}")
+            addresses.append(", ".join(parts))
+        return addresses
+
+    def clients(self, rows: int, start_id: int = 1) -> Iterator[List[Dict[str, Any]]]:
+        """Отдаёт клиентов пачками по GENERATE_CHUNK_SIZE"""
+        rng = self.rng
+        for start in range(0, rows, GENERATE_CHUNK_SIZE):
+            n = min(GENERATE_CHUNK_SIZE, rows - start)
+            building = rng.choice(len(BUILDING_TYPES), size=n, p=BUILDING_WEIGHTS)
+            rooms = rng.integers(1, 7, size=n).tolist()
+            residents = rng.integers(1, 7, size=n).tolist()
+            area = np.round(rng.uniform(20, 300, size=n), 1).tolist()
+            commercial = rng.random(n) < COMMERCIAL_RATE
+            base_load = np.where(commercial, rng.uniform(3500, 15000, n), rng.uniform(200, 2000, n))
+            consumption = base_load[:, None] * SEASONALITY[None, :] * rng.uniform(0.8, 1.2, (n, 12))
+            consumption_int = consumption.astype(np.int64).tolist()
+            consumption_float = np.round(consumption, 2).tolist()
+            missing_months = (rng.random((n, 12)) < MISSING_MONTH_RATE).tolist()
+            missing_fields = (rng.random((n, 4)) < MISSING_FIELD_RATE).tolist()
+            comma = (rng.random((n, 2)) < COMMA_DECIMAL_RATE).tolist()
+            addresses = self._addresses(building)
+            months = [str(month + 1) for month in range(12)]
+
+            chunk = []
+            for i in range(n):
+                missing = missing_fields[i]
+                client = {
+                    "accountId": start_id + start + i,
+                    "isCommercial": bool(commercial[i]),
+                    "address": addresses[i] if not missing[0] else None,
+                    "buildingType": BUILDING_TYPES[building[i]],
+                }
+                if not missing[1]:
+                    client["roomsCount"] = rooms[i]
+                if not missing[2]:
+                    client["residentsCount"] = residents[i]
+                if not missing[3]:
+                    # Часть площадей записана строкой с запятой, как в выгрузках из Excel
+                    client["totalArea"] = str(area[i]).replace('.', ',') if comma[i][0] else area[i]
+                if comma[i][1]:
+                    values = [str(value).replace('.', ',') for value in consumption_float[i]]
+                else:
+                    values = consumption_int[i]
+                skip = missing_months[i]
+                client["consumption"] = {months[m]: values[m] for m in range(12) if not skip[m]}
+                chunk.append(client)
+            yield chunk
+
+
+def write_report(path: str, rows: int, seed: int = 42) -> str:
+    """
+    Записывает отчёт из rows клиентов в JSON файл. Файл пишется потоково,
+    клиенты целиком в памяти не держатся
+    """
+    generator = ReportGenerator(seed)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        first = True
+        for chunk in generator.clients(rows):
+            for client in chunk:
+                if not first:
+                    f.write(',')
+                f.write(json.dumps(client, ensure_ascii=False))
+                first = False
+        f.write(']')
+    os.replace(tmp_path, path)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="количество клиентов")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора")
+    parser.add_argument("--output", required=True, help="путь к JSON файлу")
+    args = parser.parse_args()
+
+    write_report(args.output, args.rows, args.seed)
+    print(f"{args.output}: {args.rows} клиентов, {os.path.getsize(args.output)} байт")
+
+
+if __name__ == "__main__":
+    main()
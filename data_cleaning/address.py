@@ -0,0 +1,153 @@
+import logging
+import re
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Полные названия и варианты сокращений → каноническое сокращение
+ABBREVIATIONS = [
+    (r'улица|ул', 'ул'),
+    (r'переулок|пер', 'пер'),
+    (r'проспект|просп|пр-кт', 'пр-кт'),
+    (r'проезд|пр-д', 'проезд'),
+    (r'бульвар|б-р', 'б-р'),
+    (r'шоссе|ш', 'ш'),
+    (r'микрорайон|мкр-н|мкр', 'мкр'),
+    (r'территория|тер', 'тер'),
+    (r'район|р-н', 'р-н'),
+    (r'область|обл', 'обл'),
+    (r'республика|респ', 'респ'),
+    (r'город|г', 'г'),
+    (r'поселок городского типа|пгт', 'пгт'),
+    (r'поселок|пос|п', 'п'),
+    (r'станица|ст-ца', 'ст-ца'),
+    (r'село|с', 'с'),
+    (r'хутор|х', 'х'),
+    (r'деревня|дер', 'дер'),
+    (r'дом|д', 'д'),
+    (r'корпус|корп', 'к'),
+    (r'строение|стр', 'стр'),
+    (r'квартира|кв', 'кв'),
+]
+
+_SHORT_FORMS = {form: short for forms, short in ABBREVIATIONS for form in forms.split('|')}
+# Однословные формы ищутся по словарю (с точкой на конце и без: "д." и "д"),
+# многословные заменяются до разбиения на слова
+_WORD_FORMS = {
+    **{form: short for form, short in _SHORT_FORMS.items() if ' ' not in form},
+    **{form + '.': short for form, short in _SHORT_FORMS.items() if ' ' not in form},
+}
+# "к." отдельным словом — корпус ("д 3, к. 2"), но "к.маркса" остаётся как есть
+_WORD_FORMS['к.'] = 'к'
+_PHRASE_FORMS = [(form, short) for form, short in _SHORT_FORMS.items() if ' ' in form]
+
+# Номер дома: "д 36", "д 54 б", "д 5/1"; буква литеры — одна, иначе это
+# следующее слово ("д 87 участок"). "к" после номера — корпус, а не литера.
+# Выражения начинаются с буквы сокращения, а не с альтернативы разделителей:
+# так re ищет их по первой букве, и разбор адреса в несколько раз быстрее.
+# Проверка "перед сокращением начало строки, пробел или запятая" — lookbehind
+_HOUSE = re.compile(r'д(?<![^\s,]д)\s*(?P<number>\d+(?:/\d+)?)\s*(?P<letter>(?!к(?!\w))[а-я](?!\w))?')
+# Корпус или строение, в том числе слитно с номером дома ("д 3к2").
+# Вид (к или стр) остаётся в ключе здания: "д 5 к 2" и "д 5 стр 2" — разные здания
+_CORPUS = re.compile(r'(?P<kind>к|стр)(?<![^\s,\d]к)(?<![^\s,\d]стр)\s*(?P<corpus>\d+\w*)')
+_APARTMENT = re.compile(r'кв(?<![^\s,]кв)(?<!^кв)\s*(?P<apartment>\d+\w*)')
+
+
+def _abbreviate_words(part: str) -> List[str]:
+    """Слова части адреса с каноническими сокращениями"""
+    words = []
+    for word in part.split():
+        short = _WORD_FORMS.get(word)
+        if short is None and '.' in word:
+            # Сокращение с точкой без пробела: "ул.мира", "д.36" (но не "р.люксембург")
+            head, _, tail = word.partition('.')
+            if head in _WORD_FORMS and tail:
+                words.append(_WORD_FORMS[head])
+                word = tail
+                short = _WORD_FORMS.get(tail)
+        words.append(short or word)
+    return words
+
+
+def _normalize_one(address: str) -> Optional[str]:
+    """
+    Нормализует одну строку адреса. Сокращения ищутся по словарю среди слов —
+    всего, что между пробелами и запятыми, поэтому "с/т" и "ростов-на-дону"
+    не разбиваются на части
+    """
+    s = address.lower().replace('ё', 'е')
+    for form, short in _PHRASE_FORMS:
+        s = s.replace(form, short)
+    parts = [' '.join(words) for words in map(_abbreviate_words, s.split(',')) if words]
+    return ', '.join(parts) or None
+
+
+def normalize_address_series(addresses: pd.Series) -> pd.Series:
+    """
+    Приводит адреса к единому виду: нижний регистр, ё → е, единые
+    сокращения (ул, пер, д, кв, ...) без точек и одинаковые разделители.
+    Каждый различный адрес нормализуется один раз (квартиры одного дома,
+    повторы клиента в файле), результат раскладывается обратно по строкам
+    """
+    codes, uniques = pd.factorize(addresses)
+    normalized = pd.array([_normalize_one(str(value)) for value in uniques], dtype='string')
+    return pd.Series(normalized.take(codes, allow_fill=True), index=addresses.index)
+
+
+def _parse_normalized(normalized: str) -> Tuple[Optional[str], Optional[str], Optional[str], str]:
+    """Регион, дом, квартира и building_key нормализованного адреса (см. parse_addresses)"""
+    # Регион — первая часть адреса до запятой (субъект РФ)
+    region, comma, _ = normalized.partition(',')
+    region = region.strip() if comma else None
+
+    apartment = _APARTMENT.search(normalized)
+    house = _HOUSE.search(normalized)
+    if house is None:
+        if apartment is None:
+            return region, None, None, normalized
+        without_apartment = normalized[:apartment.start()].rstrip(' ,') + normalized[apartment.end():]
+        return region, None, apartment.group('apartment'), without_apartment.strip(' ,')
+
+    house_number = house.group('number') + (house.group('letter') or '')
+    # Населённый пункт и улица — всё до номера дома
+    street = normalized[:house.start()].strip(' ,')
+    building = f"{street}, д {house_number}" if street else f"д {house_number}"
+    corpus = _CORPUS.search(normalized, house.end() - 1)
+    if corpus is not None:
+        building += f" {corpus.group('kind')} {corpus.group('corpus')}"
+    return region, house_number, apartment.group('apartment') if apartment else None, building
+
+
+def parse_addresses(addresses: pd.Series) -> pd.DataFrame:
+    """
+    Нормализует адреса и выделяет из них регион, дом и квартиру.
+
+    building_key — адрес здания без квартиры: "<населённый пункт, улица>, д <дом>[ к <корпус> | стр <строение>]".
+    Квартиры одного дома получают одинаковый building_key, поэтому по нему
+    можно группировать клиентов и выполнять внешние проверки один раз на здание.
+    Если номер дома не найден, ключом служит нормализованный адрес без квартиры.
+    Разбирается каждый различный адрес один раз.
+
+    Returns:
+        DataFrame с колонками normalized, region, house, apartment, building_key
+        (индекс совпадает с addresses)
+    """
+    codes, uniques = pd.factorize(addresses)
+    rows = []
+    for value in uniques:
+        normalized = _normalize_one(str(value))
+        rows.append((normalized, *_parse_normalized(normalized)) if normalized else (None,) * 5)
+    parsed = pd.DataFrame(
+        rows,
+        columns=['normalized', 'region', 'house', 'apartment', 'building_key'],
+        dtype='string',
+    )
+    # Разбор различных адресов раскладывается по строкам, пустой адрес (код -1) — NA
+    parsed = parsed.reindex(codes)
+    parsed.index = addresses.index
+    return parsed
+
@@ -1,24 +1,133 @@
 import asyncio
 import logging
-from sqlalchemy import select
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from utils.database import get_async_session
+from utils.config import (
+    FROD_CLAIM_BATCH_SIZE,
+    FROD_CLIENT_TIMEOUT,
+    FROD_LEASE_SECONDS,
+    FROD_SWEEP_INTERVAL,
+    SELENIUM_POOL_SIZE,
+)
+from utils.database import async_session_maker, engine
+from utils.frod_queue import FROD_CHECK_CHANNEL, FROD_PENDING_STATE
+from utils.lookup_cache import LookupCacheStats, get_cached_lookup, purge_expired_lookups, store_lookup
 from utils.models import Client
-from .parse_report import generate_2gis_url
+from .parse_report import check_2gis_address
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def check_client_frod(client: Client, db: AsyncSession):
+LISTEN_RETRY_DELAY = 5  # пауза перед переподключением слушателя (сек)
+
+# Имя воркера в frod_lease_owner: несколько процессов проверки (на разных
+# машинах) делят очередь и не проверяют одних и тех же клиентов
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Сколько внешних проверок каждого источника идёт одновременно. Проверки
+# через Selenium ограничены числом драйверов в пуле (см. driver_pool)
+SOURCE_LIMITS = {"2gis": SELENIUM_POOL_SIZE}
+
+# Блокирующие проверки выполняются в потоках, а не в event loop
+_lookup_executor = ThreadPoolExecutor(max_workers=sum(SOURCE_LIMITS.values()), thread_name_prefix="frod-lookup")
+_source_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+async def run_lookup(source: str, func: Callable[..., Any], *args: Any, timeout: float = FROD_CLIENT_TIMEOUT) -> Any:
+    """
+    Выполняет блокирующую проверку func(*args) в пуле потоков, не больше
+    SOURCE_LIMITS[source] одновременно. Таймаут считается с начала самой
+    проверки, а не с постановки в очередь источника (asyncio.TimeoutError).
+
+    По таймауту поток не прерывается, поэтому место источника освобождается
+    только когда поток действительно закончит проверку: иначе следующая
+    проверка ждала бы свободный поток уже внутри своего таймаута
+    """
+    if source not in _source_semaphores:
+        _source_semaphores[source] = asyncio.Semaphore(SOURCE_LIMITS[source])
+    semaphore = _source_semaphores[source]
+    await semaphore.acquire()
+    loop = asyncio.get_running_loop()
+    try:
+        future = _lookup_executor.submit(func, *args)
+    except BaseException:
+        semaphore.release()
+        raise
+
+    def release(_):
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            pass  # event loop уже закрыт
+
+    future.add_done_callback(release)
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+async def lookup_2gis(key: str, address: str, stats: Optional[LookupCacheStats] = None) -> Optional[str]:
+    """
+    Проверяет здание в 2GIS, сначала заглядывая в кэш проверок (lookup_cache).
+    Завершившаяся проверка сохраняется в кэш, в том числе пустой результат;
+    ошибка Selenium в кэш не попадает и, как и раньше, считается отсутствием
+    совпадений. Таймаут проверки пробрасывается (asyncio.TimeoutError)
+    """
+    if not address:
+        return None
+    async with async_session_maker() as db:
+        cached = await get_cached_lookup(db, "2gis", key)
+    if cached is not None:
+        if stats is not None:
+            stats.hit("2gis")
+        return cached.result_url
+    if stats is not None:
+        stats.miss("2gis")
+
+    try:
+        url, evidence = await run_lookup("2gis", check_2gis_address, address)
+    except asyncio.TimeoutError:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при проверке адреса {address} в 2GIS: {str(e)}")
+        return None
+
+    try:
+        async with async_session_maker() as db:
+            await store_lookup(db, "2gis", key, url, evidence)
+            await db.commit()
+    except Exception as e:
+        # Результат проверки уже получен, без кэша здание просто проверится снова
+        logger.error(f"Ошибка сохранения результата 2GIS в кэш: {str(e)}")
+    return url
+
+async def check_client_frod(
+    client: Client,
+    db: AsyncSession,
+    lookups: Optional[Dict[str, asyncio.Future]] = None,
+    stats: Optional[LookupCacheStats] = None,
+):
     """
-    Проверяет одного клиента на фрод
+    Проверяет одного клиента на фрод.
+    lookups — проверки 2GIS по ключу здания: квартиры одного дома
+    ждут результат одного запроса, даже если проверяются одновременно.
+    Между запусками результат здания берётся из кэша проверок (см. lookup_2gis)
     """
     try:
         logger.info(f"Проверка клиента {client.id} с адресом: {client.address}")
         
-        # Проверяем 2GIS
-        z2gis = generate_2gis_url(client.address)
+        # Проверяем 2GIS, один раз на здание
+        key = client.building_key or client.address
+        if lookups is None:
+            z2gis = await lookup_2gis(key, client.address, stats)
+        else:
+            if key not in lookups:
+                lookups[key] = asyncio.ensure_future(lookup_2gis(key, client.address, stats))
+            # shield: отмена одного клиента не отменяет общий запрос для остальных квартир
+            z2gis = await asyncio.shield(lookups[key])
         
         # Обновляем данные клиента
         client.frod_2gis = z2gis
@@ -27,46 +136,211 @@ async def check_client_frod(client: Client, db: AsyncSession):
         
         logger.info(f"Клиент {client.id} проверен, результат: {client.frod_state}")
         
+    except asyncio.TimeoutError:
+        logger.error(f"Таймаут проверки клиента {client.id} ({FROD_CLIENT_TIMEOUT} сек)")
+        client.frod_state = "Ошибка проверки"
     except Exception as e:
         logger.error(f"Ошибка при проверке клиента {client.id}: {str(e)}", exc_info=True)
         client.frod_state = "Ошибка проверки"
 
-async def check_pending_clients():
+async def claim_pending_clients(limit: int = FROD_CLAIM_BATCH_SIZE) -> List[int]:
     """
-    Проверяет всех клиентов со статусом "Оценивается"
+    Забирает до limit ожидающих проверки клиентов в аренду на FROD_LEASE_SECONDS.
+    SELECT ... FOR UPDATE SKIP LOCKED пропускает строки, которые в этот момент
+    забирает другой воркер, а клиенты с истёкшей арендой (воркер упал) снова
+    доступны. Транзакция короткая: сама проверка идёт уже без блокировок
+
+    Returns:
+        id забранных клиентов
+    """
+    async with async_session_maker() as db:
+        candidates = (
+            select(Client.id)
+            .where(
+                Client.frod_state == FROD_PENDING_STATE,
+                (Client.frod_lease_until.is_(None)) | (Client.frod_lease_until < func.now()),
+            )
+            .order_by(Client.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            update(Client)
+            .where(Client.id.in_(candidates))
+            .values(frod_lease_owner=WORKER_ID, frod_lease_until=func.now() + timedelta(seconds=FROD_LEASE_SECONDS))
+            .returning(Client.id)
+            .execution_options(synchronize_session=False)
+        )
+        client_ids = list(result.scalars().all())
+        await db.commit()
+    return client_ids
+
+async def extend_lease(client_ids: List[int]) -> int:
+    """Продлевает аренду клиентов, которые всё ещё закреплены за этим воркером"""
+    async with async_session_maker() as db:
+        result = await db.execute(
+            update(Client)
+            .where(Client.id.in_(client_ids), Client.frod_lease_owner == WORKER_ID)
+            .values(frod_lease_until=func.now() + timedelta(seconds=FROD_LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount
+
+async def keep_lease(client_ids: List[int]) -> None:
+    """Продлевает аренду каждую треть срока, пока идёт проверка пачки"""
+    while True:
+        await asyncio.sleep(FROD_LEASE_SECONDS / 3)
+        try:
+            extended = await extend_lease(client_ids)
+            logger.info(f"Аренда продлена для {extended} из {len(client_ids)} клиентов")
+        except Exception as e:
+            logger.error(f"Ошибка продления аренды клиентов: {str(e)}", exc_info=True)
+
+async def save_check_result(client: Client) -> bool:
+    """
+    Сохраняет результат проверки клиента сразу после её завершения и снимает
+    аренду. Запись идёт только пока клиент закреплён за этим воркером: если
+    аренда истекла и клиента забрал другой воркер, результат отбрасывается
+
+    Returns:
+        Был ли результат записан
+    """
+    async with async_session_maker() as db:
+        result = await db.execute(
+            update(Client)
+            .where(Client.id == client.id, Client.frod_lease_owner == WORKER_ID)
+            .values(
+                frod_2gis=client.frod_2gis,
+                frod_procentage=client.frod_procentage,
+                frod_state=client.frod_state,
+                frod_lease_owner=None,
+                frod_lease_until=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    if not result.rowcount:
+        logger.warning(f"Аренда клиента {client.id} истекла, результат не сохранён")
+    return bool(result.rowcount)
+
+async def check_claimed_clients(
+    client_ids: List[int],
+    lookups: Dict[str, asyncio.Future],
+    stats: Optional[LookupCacheStats] = None,
+) -> int:
+    """
+    Проверяет забранных клиентов параллельно. Каждый результат записывается
+    в БД, как только готов (save_check_result), а не после всей пачки
+
+    Returns:
+        Сколько результатов записано
+    """
+    async with async_session_maker() as db:
+        result = await db.execute(select(Client).where(Client.id.in_(client_ids)))
+        clients = result.scalars().all()
+        # Проверка долгая, соединение не должно висеть в транзакции
+        await db.commit()
+
+        buildings = len({client.building_key or client.address for client in clients})
+        logger.info(f"Получено {len(clients)} клиентов для проверки в {buildings} зданиях")
+
+        async def check_and_save(client: Client) -> bool:
+            await check_client_frod(client, db, lookups, stats)
+            try:
+                return await save_check_result(client)
+            except Exception as e:
+                # Клиент остаётся в очереди и будет забран снова после истечения аренды
+                logger.error(f"Ошибка сохранения результата клиента {client.id}: {str(e)}", exc_info=True)
+                return False
+
+        heartbeat = asyncio.create_task(keep_lease(client_ids))
+        try:
+            # Запускаем проверку параллельно
+            saved = await asyncio.gather(*(check_and_save(client) for client in clients))
+        finally:
+            heartbeat.cancel()
+    return sum(saved)
+
+async def check_pending_clients() -> int:
+    """
+    Проверяет клиентов со статусом "Оценивается" пачками по FROD_CLAIM_BATCH_SIZE,
+    пока очередь не опустеет. Каждую пачку воркер забирает в аренду
+    (claim_pending_clients), поэтому несколько воркеров проверяют очередь
+    параллельно без повторов. Выборка идёт по частичному индексу ix_clients_frod_pending
+
+    Returns:
+        Количество проверенных клиентов
     """
     logger.info("Начало проверки клиентов")
+    checked = 0
+    lookups: Dict[str, asyncio.Future] = {}
+    stats = LookupCacheStats()
     try:
-        async for db in get_async_session():
-            # Получаем всех клиентов со статусом "Оценивается"
-            query = select(Client).where(Client.frod_state == "Оценивается")
-            result = await db.execute(query)
-            clients = result.scalars().all()
-            
-            if not clients:
-                logger.info("Нет клиентов для проверки")
-                return
-            
-            logger.info(f"Найдено {len(clients)} клиентов для проверки")
-            
-            # Создаем задачи для проверки каждого клиента
-            tasks = [check_client_frod(client, db) for client in clients]
-            
-            # Запускаем проверку параллельно
-            await asyncio.gather(*tasks)
-            
-            # Сохраняем все изменения
+        async with async_session_maker() as db:
+            purged = await purge_expired_lookups(db)
             await db.commit()
-            
-            logger.info("Проверка клиентов завершена")
-            
+        if purged:
+            logger.info(f"Удалено истёкших результатов из кэша проверок: {purged}")
+
+        while True:
+            client_ids = await claim_pending_clients()
+            if not client_ids:
+                break
+            checked += await check_claimed_clients(client_ids, lookups, stats)
     except Exception as e:
         logger.error(f"Ошибка при проверке клиентов: {str(e)}", exc_info=True)
 
-async def start_frod_checker():
+    if checked:
+        logger.info(f"Проверка клиентов завершена, проверено: {checked}")
+        logger.info(f"Кэш проверок, попаданий по зданиям: {stats.summary()}")
+    else:
+        logger.info("Нет клиентов для проверки")
+    return checked
+
+async def listen_frod_check(wakeup: asyncio.Event) -> None:
     """
-    Запускает бесконечный цикл проверки клиентов
+    Держит отдельное соединение с LISTEN на канал FROD_CHECK_CHANNEL и
+    выставляет wakeup на каждый сигнал от загрузки отчетов. При обрыве
+    соединения переподключается; сигналы, пропущенные за это время,
+    подхватывает проверка сразу после переподключения
     """
     while True:
-        await check_pending_clients()
-        await asyncio.sleep(60)  # Ждем 1 минуту перед следующей проверкой 
\ No newline at end of file
+        try:
+            async with engine.connect() as conn:
+                raw_connection = await conn.get_raw_connection()
+                connection = raw_connection.driver_connection
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(FROD_CHECK_CHANNEL, lambda *_: wakeup.set())
+                logger.info(f"Ожидание сигналов проверки на фрод в канале {FROD_CHECK_CHANNEL}")
+                wakeup.set()
+                await closed.wait()
+                logger.warning("Соединение для сигналов проверки на фрод закрыто")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка подписки на сигналы проверки на фрод: {str(e)}", exc_info=True)
+        await asyncio.sleep(LISTEN_RETRY_DELAY)
+
+async def start_frod_checker():
+    """
+    Запускает бесконечный цикл проверки клиентов. Проверка начинается сразу
+    по сигналу NOTIFY от загрузки отчетов (см. utils.frod_queue), а раз
+    в FROD_SWEEP_INTERVAL секунд очередь проверяется и без сигнала —
+    на случай потерянного сигнала или клиентов, поставленных в очередь вручную
+    """
+    wakeup = asyncio.Event()
+    listener = asyncio.create_task(listen_frod_check(wakeup))
+    try:
+        while True:
+            # Сигналы, пришедшие во время проверки, оставят событие взведённым
+            wakeup.clear()
+            await check_pending_clients()
+            try:
+                await asyncio.wait_for(wakeup.wait(), FROD_SWEEP_INTERVAL)
+            except asyncio.TimeoutError:
+                logger.info("Плановая проверка очереди клиентов")
+    finally:
+        listener.cancel() 
\ No newline at end of file
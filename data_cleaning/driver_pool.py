@@ -0,0 +1,209 @@
+import atexit
+import logging
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+import psutil
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+
+from utils.config import (
+    SELENIUM_CHECKOUT_TIMEOUT,
+    SELENIUM_MAX_PAGES,
+    SELENIUM_MAX_RSS_MB,
+    SELENIUM_PAGE_TIMEOUT,
+    SELENIUM_POOL_SIZE,
+)
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def create_chrome_driver(profile_dir: str) -> webdriver.Chrome:
+    """Headless Chrome со своим профилем: два экземпляра не могут делить один профиль"""
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-software-rasterizer')
+    chrome_options.add_argument('--disable-features=VizDisplayCompositor')
+
+    driver = webdriver.Chrome(options=chrome_options)
+    # Зависшая страница прерывается, а не блокирует драйвер навсегда
+    driver.set_page_load_timeout(SELENIUM_PAGE_TIMEOUT)
+    return driver
+
+
+class PooledDriver:
+    """Драйвер из пула и его счётчик открытых страниц"""
+
+    def __init__(self, driver: webdriver.Chrome, profile_dir: str):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.pages = 0
+        self.created_at = time.monotonic()
+
+    def rss_mb(self) -> Optional[float]:
+        """Память chromedriver и всех процессов Chrome, запущенных им (МБ)"""
+        try:
+            process = psutil.Process(self.driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(child.memory_info().rss for child in processes) / (1024 * 1024)
+        except (psutil.Error, AttributeError):
+            return None
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class SeleniumDriverPool:
+    """
+    Ограниченный пул headless-драйверов Chrome для внешних проверок адресов.
+
+    Драйвер берётся на время одной проверки (checkout) и возвращается в пул,
+    поэтому до size проверок идут параллельно в разных потоках. Драйверы
+    создаются по мере надобности. Драйвер перезапускается после max_pages
+    страниц или при росте памяти процессов Chrome выше max_rss_mb, а упавший
+    драйвер (WebDriverException внутри checkout) закрывается и при следующем
+    запросе заменяется новым
+    """
+
+    def __init__(
+        self,
+        size: int = SELENIUM_POOL_SIZE,
+        max_pages: int = SELENIUM_MAX_PAGES,
+        max_rss_mb: float = SELENIUM_MAX_RSS_MB,
+        factory: Callable[[str], webdriver.Chrome] = create_chrome_driver,
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._factory = factory
+        self._idle: List[PooledDriver] = []
+        self._created = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self.stats = {"created": 0, "recycled": 0, "crashed": 0, "checkouts": 0}
+
+    def _acquire(self, timeout: Optional[float]) -> PooledDriver:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Пул драйверов закрыт")
+                if self._idle:
+                    self.stats["checkouts"] += 1
+                    return self._idle.pop()
+                if self._created < self.size:
+                    # Место под новый драйвер занимаем сразу, а создаём его вне блокировки
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Нет свободного драйвера за {timeout} сек")
+                self._condition.wait(remaining)
+
+        profile_dir = tempfile.mkdtemp(prefix='chrome_profile_')
+        try:
+            pooled = PooledDriver(self._factory(profile_dir), profile_dir)
+        except Exception as e:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            self._discard_slot()
+            logger.error(f"Ошибка при инициализации драйвера: {str(e)}")
+            raise
+        with self._condition:
+            self.stats["created"] += 1
+            self.stats["checkouts"] += 1
+        logger.info(f"Драйвер Chrome успешно инициализирован, драйверов в пуле: {self._created}")
+        return pooled
+
+    def _discard_slot(self) -> None:
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+
+    def _release(self, pooled: PooledDriver, broken: bool) -> None:
+        reason = None
+        if broken:
+            reason = "ошибка драйвера"
+            self.stats["crashed"] += 1
+        elif pooled.pages >= self.max_pages:
+            reason = f"открыто страниц: {pooled.pages}"
+        else:
+            rss = pooled.rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                reason = f"память {rss:.0f} МБ"
+
+        if reason is None and not self._closed:
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+            return
+
+        if not broken and reason is not None:
+            self.stats["recycled"] += 1
+        logger.info(f"Перезапуск драйвера Chrome ({reason or 'пул закрыт'})")
+        pooled.quit()
+        self._discard_slot()
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = SELENIUM_CHECKOUT_TIMEOUT) -> Iterator[webdriver.Chrome]:
+        """
+        Берёт драйвер из пула на время блока with. Если свободного драйвера
+        нет и пул заполнен, ждёт до timeout секунд (TimeoutError)
+        """
+        pooled = self._acquire(timeout)
+        broken = False
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            # Сюда попадают и таймауты загрузки страницы (set_page_load_timeout):
+            # зависший Chrome перезапускается. Ожидание элементов (WebDriverWait)
+            # вызывающий код обрабатывает внутри блока with
+            broken = True
+            raise
+        finally:
+            pooled.pages += 1
+            self._release(pooled, broken)
+
+    def close(self) -> None:
+        """Закрывает все свободные драйверы; занятые закроются при возврате"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for pooled in idle:
+            pooled.quit()
+            self._discard_slot()
+        if idle:
+            logger.info(f"Драйверы Chrome закрыты: {len(idle)}")
+
+
+_pool: Optional[SeleniumDriverPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> SeleniumDriverPool:
+    """Общий пул драйверов процесса, создаётся при первой проверке"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SeleniumDriverPool()
+                atexit.register(_pool.close)
+    return _pool
@@ -1,5 +1,5 @@
 import pandas as pd
-from typing import List
+from typing import List, Optional
 
 # Заполнение пропусков средними по buildingType и region
 def fill_missing_by_group(df: pd.DataFrame, target_col: str, group_cols: List[str]) -> pd.DataFrame:
@@ -70,4 +70,157 @@ def fill_missing_by_group(df: pd.DataFrame, target_col: str, group_cols: List[st
     for col in numeric_columns:
         df[col] = df[col].round(2)
     
-    return df
\ No newline at end of file
+    return df
+
+def fill_missing_grouped(
+    df: pd.DataFrame,
+    target_cols: List[str],
+    group_cols: List[str],
+    hierarchical: bool = False,
+    agg: str = 'median',
+    reference: Optional[pd.DataFrame] = None,
+    round_decimals: Optional[int] = 2,
+) -> pd.DataFrame:
+    """
+    Заполняет пропуски сразу во всех target_cols статистикой по группам.
+    
+    В отличие от fill_missing_by_group, медианы всех колонок считаются одним
+    groupby и подставляются через transform, без копирования DataFrame и без
+    цикла по группам, поэтому стоимость растёт с числом строк, а не строк × групп.
+    
+    Args:
+        df: DataFrame с данными, изменяется на месте
+        target_cols: Столбцы, которые нужно заполнить (отсутствующие пропускаются)
+        group_cols: Столбцы для группировки, от самого общего к самому точному
+        hierarchical: Если группа не дала значения, брать статистику по более
+            общей группе (group_cols без последнего столбца и т.д.), а затем по всем данным
+        agg: Агрегат для заполнения ('median', 'mean', ...)
+        reference: DataFrame, по которому считается статистика (по умолчанию сам df)
+        round_decimals: До скольки знаков округлить float-столбцы, None — не округлять
+    
+    Returns:
+        Тот же DataFrame с заполненными пропущенными значениями
+    """
+    cols = [col for col in target_cols if col in df.columns]
+    if cols:
+        # Статистику считаем по исходным значениям, а не по уже заполненным на предыдущем уровне
+        source = reference if reference is not None else (df[group_cols + cols].copy() if hierarchical else df)
+        levels = [group_cols]
+        if hierarchical:
+            levels += [group_cols[:i] for i in range(len(group_cols) - 1, 0, -1)]
+        
+        for level in levels:
+            if not df[cols].isna().any().any():
+                break
+            if source is df:
+                fill = df.groupby(level, sort=False)[cols].transform(agg)
+            else:
+                stats = source.groupby(level, sort=False)[cols].agg(agg)
+                fill = df[level].join(stats, on=level)[cols]
+            for col in cols:
+                df[col] = df[col].fillna(fill[col])
+        
+        if hierarchical:
+            global_stats = source[cols].agg(agg)
+            for col in cols:
+                df[col] = df[col].fillna(global_stats[col])
+    
+    _round_float_columns(df, round_decimals)
+    return df
+
+def _round_float_columns(df: pd.DataFrame, round_decimals: Optional[int]) -> None:
+    # Округляем все числовые столбцы до нужного количества знаков после запятой
+    if round_decimals is not None:
+        for col in df.select_dtypes(include=['float64']).columns:
+            df[col] = df[col].round(round_decimals)
+
+# Значение столбца группировки в статистике, означающее "любое" (более общий уровень)
+ANY_GROUP = '*'
+
+def group_stats_delta(df: pd.DataFrame, target_cols: List[str], group_cols: List[str]) -> pd.DataFrame:
+    """
+    Суммы и количества известных (не пропущенных) значений target_cols
+    по всем уровням группировки: group_cols, group_cols без последнего
+    столбца и т.д. до всех данных. На более общих уровнях отброшенные
+    столбцы группировки равны ANY_GROUP.
+    
+    Такие суммы можно складывать между отчетами и по ним получать средние
+    для fill_missing_from_stats без повторного чтения исходных данных.
+    
+    Returns:
+        DataFrame с колонками group_cols + ['field', 'value_sum', 'value_count']
+    """
+    cols = [col for col in target_cols if col in df.columns]
+    result_columns = group_cols + ['field', 'value_sum', 'value_count']
+    if not cols or df.empty:
+        return pd.DataFrame(columns=result_columns)
+    
+    values = df[group_cols + cols].melt(id_vars=group_cols, var_name='field', value_name='value')
+    values = values[values['value'].notna()]
+    
+    levels = []
+    for depth in range(len(group_cols), -1, -1):
+        level = group_cols[:depth]
+        # Строки с пропуском в столбцах группировки попадают только в более общие уровни
+        stats = values.groupby(level + ['field'], sort=False)['value'].agg(['sum', 'count']).reset_index()
+        for col in group_cols[depth:]:
+            stats[col] = ANY_GROUP
+        levels.append(stats.rename(columns={'sum': 'value_sum', 'count': 'value_count'}))
+    return pd.concat(levels, ignore_index=True)[result_columns]
+
+def fill_missing_from_stats(
+    df: pd.DataFrame,
+    stats: pd.DataFrame,
+    target_cols: List[str],
+    group_cols: List[str],
+    round_decimals: Optional[int] = 2,
+) -> pd.DataFrame:
+    """
+    Заполняет пропуски средними из заранее посчитанной статистики
+    (см. group_stats_delta), без группировки самого df.
+    
+    Для каждого уровня — от самой точной группы к общему среднему — средние
+    разворачиваются в таблицу и подставляются одним join по столбцам группы.
+    Пропуски, для которых на точном уровне статистики нет, берутся с более общего.
+    
+    Args:
+        df: DataFrame с данными, изменяется на месте
+        stats: Статистика с колонками group_cols + ['field', 'value_sum', 'value_count']
+        target_cols: Столбцы, которые нужно заполнить
+        group_cols: Столбцы для группировки, от самого общего к самому точному
+        round_decimals: До скольки знаков округлить float-столбцы, None — не округлять
+    
+    Returns:
+        Тот же DataFrame с заполненными пропущенными значениями
+    """
+    cols = [col for col in target_cols if col in df.columns]
+    stats = stats[stats['field'].isin(cols) & (stats['value_count'] > 0)]
+    means = stats.assign(mean=stats['value_sum'] / stats['value_count'])
+    
+    for depth in range(len(group_cols), -1, -1):
+        if not cols or not df[cols].isna().any().any():
+            break
+        level = group_cols[:depth]
+        is_level = pd.Series(True, index=means.index)
+        for col in level:
+            is_level &= means[col] != ANY_GROUP
+        for col in group_cols[depth:]:
+            is_level &= means[col] == ANY_GROUP
+        level_means = means[is_level]
+        if level_means.empty:
+            continue
+        
+        if level:
+            wide = level_means.pivot_table(index=level, columns='field', values='mean', aggfunc='first')
+            fill = df[level].join(wide, on=level)
+            for col in cols:
+                if col in wide.columns:
+                    df[col] = df[col].fillna(fill[col])
+        else:
+            global_means = level_means.groupby('field')['mean'].first()
+            for col in cols:
+                if col in global_means.index:
+                    df[col] = df[col].fillna(global_means[col])
+    
+    _round_float_columns(df, round_decimals)
+    return df
@@ -1,27 +1,28 @@
-import json
-from typing import List, Dict, Any, Optional, Union
+import itertools
+from typing import List, Dict, Any, Optional, Tuple, Union
 from faker import Faker
 import pandas as pd
 import numpy as np
 import requests
+from utils.frod_queue import FROD_PENDING_STATE
+from utils.metrics import PipelineMetrics, log_client_sampled
 from utils.models import Client
 import urllib.parse
-from .fill_missing import fill_missing_by_group
+from .address import parse_addresses
+from .driver_pool import get_driver_pool
+from .fill_missing import fill_missing_from_stats, fill_missing_grouped, group_stats_delta
+from .report_reader import RECORDS_CHUNK_SIZE, iter_records, iter_report_records
+from .report_cache import read_prepared_rows, read_report_cache, write_prepared_frame, write_report_cache
 import logging
 from urllib.parse import quote
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-import tempfile
+from selenium.common.exceptions import TimeoutException
 import os
 import uuid
-import threading
 import time
-import atexit
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -30,68 +31,6 @@ logger = logging.getLogger(__name__)
 # Устанавливаем опцию для будущего поведения pandas
 pd.set_option('future.no_silent_downcasting', True)
 
-class SeleniumDriver:
-    _instance = None
-    _lock = threading.Lock()
-    _driver = None
-    _is_initialized = False
-    
-    @classmethod
-    def get_instance(cls):
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = cls()
-        return cls._instance
-    
-    def __init__(self):
-        if not self._is_initialized:
-            self._initialize_driver()
-            self._is_initialized = True
-            atexit.register(self.cleanup)
-    
-    def _initialize_driver(self):
-        """Инициализация драйвера Chrome"""
-        temp_dir = os.path.join(tempfile.gettempdir(), 'chrome_profile')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        chrome_options.add_argument(f'--user-data-dir={temp_dir}')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-software-rasterizer')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        
-        try:
-            self._driver = webdriver.Chrome(options=chrome_options)
-            logger.info("Драйвер Chrome успешно инициализирован")
-        except Exception as e:
-            logger.error(f"Ошибка при инициализации драйвера: {str(e)}")
-            raise
-    
-    def get_driver(self):
-        """Получение экземпляра драйвера"""
-        if self._driver is None:
-            self._initialize_driver()
-        return self._driver
-    
-    def cleanup(self):
-        """Очистка ресурсов драйвера"""
-        if self._driver:
-            try:
-                self._driver.quit()
-                logger.info("Драйвер Chrome успешно закрыт")
-            except:
-                pass
-            finally:
-                self._driver = None
-                self._is_initialized = False
-
 def is_nan_or_none(value: Any) -> bool:
     """
     Безопасная проверка на NaN или None
@@ -121,69 +60,66 @@ def convert_value(value: Any, target_type: type) -> Optional[Any]:
     except (ValueError, TypeError):
         return None
 
-def generate_2gis_url(address: str) -> str:
+def check_2gis_address(address: str) -> Tuple[Optional[str], Optional[str]]:
     """
-    Генерирует URL для поиска адреса в 2GIS и проверяет его через Selenium
+    Ищет адрес в 2GIS через Selenium и проверяет выдачу на признаки
+    посуточной аренды.
+
+    Returns:
+        URL поиска и найденная фраза, либо (None, None), если совпадений нет.
+        Ошибки Selenium и таймаут загрузки выдачи пробрасываются: это не
+        пустой результат, и в кэш проверок он попасть не должен
     """
-    if not address:
-        return None
-        
     logger.info(f"Генерация 2GIS URL для адреса: {address}")
     
     # Кодируем адрес для URL
     encoded_address = quote(address)
     url = f"https://2gis.ru/novorossiysk/search/{encoded_address}"
     
-    try:
-        # Получаем экземпляр драйвера
-        driver_manager = SeleniumDriver.get_instance()
-        driver = driver_manager.get_driver()
-        
+    # Драйвер берётся из пула на время одной проверки: проверки из разных
+    # потоков идут параллельно, упавший драйвер пул заменяет новым
+    with get_driver_pool().driver() as driver:
         logger.info(f"Отправка запроса к 2GIS для адреса: {address}")
+        driver.get(url)
         
         try:
-            driver.get(url)
-            
             # Ждем загрузки результатов поиска
             WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CLASS_NAME, "searchResults__list"))
             )
-            
+        except TimeoutException:
+            # Выдача не появилась — это ответ страницы, а не сбой драйвера:
+            # исключение пробрасывается уже после возврата драйвера в пул,
+            # иначе пул счёл бы исправный драйвер сломанным и перезапустил Chrome
+            page_text = None
+        else:
             # Получаем текст страницы
             page_text = driver.page_source.lower()
+    
+    if page_text is None:
+        raise TimeoutException(f"Нет результатов поиска 2GIS для адреса: {address}")
+        
+    # Проверяем наличие ключевых фраз
+    hotel_phrases = [
+        'гостиница', 'отель', 'хостел', 'апартаменты',
+        'сдается', 'аренда', 'проживание', 'номер',
+        'почасовая', 'посуточная', 'мини-отель'
+    ]
+    
+    for phrase in hotel_phrases:
+        if phrase in page_text:
+            logger.info(f"Найдено совпадение с фразой: {phrase}")
+            return url, phrase
             
-            # Проверяем наличие ключевых фраз
-            hotel_phrases = [
-                'гостиница', 'отель', 'хостел', 'апартаменты',
-                'сдается', 'аренда', 'проживание', 'номер',
-                'почасовая', 'посуточная', 'мини-отель'
-            ]
-            
-            for phrase in hotel_phrases:
-                if phrase in page_text:
-                    logger.info(f"Найдено совпадение с фразой: {phrase}")
-                    return url
-                    
-            logger.info("Совпадений не найдено")
-            return None
-            
-        except TimeoutException:
-            logger.error("Таймаут при загрузке страницы")
-            return None
-        except WebDriverException as e:
-            logger.error(f"Ошибка Selenium: {str(e)}")
-            return None
-            
-    except Exception as e:
-        logger.error(f"Ошибка при проверке адреса {address}: {str(e)}")
-        return None
+    logger.info("Совпадений не найдено")
+    return None, None
 
 def parse_client_data(client_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Извлекает данные клиента из JSON и преобразует их в формат модели Client
     с обработкой пропущенных значений и конвертацией типов
     """
-    logger.info(f"Начало парсинга данных клиента: {client_data.get('accountId', 'Unknown')}")
+    log_client_sampled(logger, f"Начало парсинга данных клиента: {client_data.get('accountId', 'Unknown')}")
     
     # Маппинг полей из входного JSON в поля модели
     field_mapping = {
@@ -242,9 +178,219 @@ def parse_client_data(client_data: Dict[str, Any]) -> Dict[str, Any]:
             # Определение коммерческого статуса
             parsed_data['is_commercial'] = parsed_data['avg_monthly_electricity'] > 3000
     
-    logger.info(f"Завершение парсинга данных клиента: {client_data.get('accountId', 'Unknown')}")
+    log_client_sampled(logger, f"Завершение парсинга данных клиента: {client_data.get('accountId', 'Unknown')}")
     return parsed_data
 
+def _to_numeric_mixed(values: List[Any]) -> np.ndarray:
+    """
+    Медленный путь to_numeric_column: через строки разбираются только
+    строковые значения (обычно это малая доля — числа с десятичной запятой),
+    остальные приводятся к float сразу
+    """
+    objects = np.array(values, dtype=object)
+    is_str = np.fromiter(map(isinstance, values, itertools.repeat(str)), dtype=bool, count=len(values))
+    result = np.empty(len(values))
+    try:
+        result[~is_str] = np.array(objects[~is_str].tolist(), dtype=float)
+    except (ValueError, TypeError):
+        # Попались значения других типов (списки, словари) — всё через строки
+        text = pd.Series(values, dtype=object).astype(str).str.replace(',', '.', regex=False).str.strip()
+        return pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+    text = [value.replace(',', '.') for value in objects[is_str].tolist()]
+    try:
+        result[is_str] = np.array(text, dtype=float)
+    except ValueError:
+        # Есть строки, которые не являются числами — они становятся NaN
+        result[is_str] = pd.to_numeric(pd.Series(text, dtype=object).str.strip(), errors='coerce').to_numpy(dtype=float)
+    return result
+
+def to_numeric_column(values: List[Any], bool_is_number: bool = False) -> np.ndarray:
+    """
+    Векторная версия float(str(value).replace(',', '.')): числа с десятичной
+    запятой разбираются, всё, что не удалось разобрать, становится NaN.
+    С bool_is_number=True логические значения приводятся как float(value)
+    """
+    try:
+        # Быстрый путь: числа, None и строки без запятой numpy разбирает сам
+        result = np.array(values, dtype=float)
+    except (ValueError, TypeError):
+        result = _to_numeric_mixed(values)
+    if bool_is_number:
+        return result
+    # float(str(True)) падает, поэтому логические значения числами не считаем
+    if bool in set(map(type, values)):
+        result[np.array([type(value) is bool for value in values])] = np.nan
+    return result
+
+def round_column(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    round(value, ndigits) для колонки. np.round округляет половины иначе,
+    чем встроенный round (12.345 -> 12.34, а не 12.35), поэтому встроенный
+    round применяется к уникальным значениям, а результат раскладывается обратно
+    """
+    result = values.copy()
+    finite = np.isfinite(values)
+    uniques, inverse = np.unique(values[finite], return_inverse=True)
+    result[finite] = np.array([round(value, ndigits) for value in uniques.tolist()], dtype=float)[inverse]
+    return result
+
+def to_integer_column(values: List[Any]) -> np.ndarray:
+    """
+    Векторная версия int(float(str(value).replace(',', '.'))): дробная часть
+    отбрасывается, нечисловые и бесконечные значения становятся NaN
+    """
+    result = np.trunc(to_numeric_column(values))
+    result[np.isinf(result)] = np.nan
+    return result
+
+def parse_clients_batch(clients: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Пакетная версия parse_client_data: разбирает сразу пачку клиентов.
+    
+    Числовые поля приводятся векторно, потребление собирается в матрицу
+    клиенты × месяцы, и все показатели считаются операциями над колонками.
+    Результат совпадает с pd.DataFrame([parse_client_data(c) for c in clients])
+    """
+    n = len(clients)
+    # map(dict.get, ...) обходит список без интерпретации байткода на каждый элемент
+    get = lambda key: list(map(dict.get, clients, itertools.repeat(key, n)))
+    
+    rooms_count = to_integer_column(get('roomsCount'))
+    people_count = to_integer_column(get('residentsCount'))
+    home_area = round_column(to_numeric_column(get('totalArea')), 2)
+    
+    columns = {
+        'id': get('accountId'),
+        'address': get('address'),
+        'home_type': get('buildingType'),
+        'rooms_count': rooms_count,
+        'people_count': people_count,
+        'home_area': home_area,
+    }
+    
+    # Матрица потребления: колонки — месяцы в порядке первого появления
+    consumption = [values if isinstance(values, dict) else {} for values in get('consumption')]
+    months = list(dict.fromkeys(itertools.chain.from_iterable(consumption)))
+    if months:
+        # Значения всех месяцев собираются одним проходом по клиентам и
+        # приводятся к числам одним вызовом, а не по колонке на месяц
+        values = list(itertools.chain.from_iterable(map(lambda row: map(row.get, months), consumption)))
+        matrix = to_numeric_column(values, bool_is_number=True).reshape(n, len(months))
+        # Показанием, как в parse_client_data, считается любое значение кроме None:
+        # строка "nan" — это показание NaN, которое портит сумму и среднее
+        missing = np.isnan(matrix)
+        missing.flat[[i for i in np.flatnonzero(missing).tolist() if values[i] is not None]] = False
+        present = ~missing
+        months_count = present.sum(axis=1)
+        has_consumption = months_count > 0
+        
+        # Складываем месяцы по порядку, как sum() по списку значений клиента
+        summary = np.zeros(n)
+        with np.errstate(invalid='ignore'):
+            for month_values in np.where(present, matrix, 0.0).T:
+                summary = summary + month_values
+        
+        if has_consumption.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                avg = summary / months_count
+                per_sqm = summary / home_area
+                per_person = summary / people_count
+            # Показатели на м² и на человека считаются только при ненулевых площади и жильцах
+            sqm_mask = has_consumption & (home_area != 0)
+            person_mask = has_consumption & (people_count != 0) & ~np.isnan(people_count)
+            
+            columns['summary_electricity'] = np.where(has_consumption, summary, np.nan)
+            columns['avg_monthly_electricity'] = np.where(has_consumption, avg, np.nan)
+            # max() и min() по списку с NaN возвращают NaN, только если NaN стоит
+            # первым в словаре клиента, а остальные NaN пропускают — fmax/fmin
+            # пропускают все. Первое показание смотрим только у клиентов с NaN
+            first_is_nan = np.zeros(n, dtype=bool)
+            for i in np.flatnonzero((present & np.isnan(matrix)).any(axis=1)).tolist():
+                first = next(value for value in consumption[i].values() if value is not None)
+                first_is_nan[i] = np.isnan(to_numeric_column([first], bool_is_number=True)[0])
+            columns['max_monthly_electricity'] = np.where(first_is_nan, np.nan, np.fmax.reduce(matrix, axis=1))
+            columns['min_monthly_electricity'] = np.where(first_is_nan, np.nan, np.fmin.reduce(matrix, axis=1))
+            if sqm_mask.any():
+                columns['electricity_per_sqm'] = np.where(sqm_mask, per_sqm, np.nan)
+            if person_mask.any():
+                columns['electricity_per_person'] = np.where(person_mask, per_person, np.nan)
+            columns['is_commercial'] = pd.Series(avg > 3000).where(has_consumption)
+        
+        # Сам помесячный ряд тоже сохраняем: он пишется в clients_consumption
+        for j, month in enumerate(months):
+            columns[CONSUMPTION_PREFIX + str(month)] = matrix[:, j]
+    
+    return pd.DataFrame(columns)
+
+# Колонки, которые в записях клиентов должны быть int / float
+INT_COLUMNS = ['people_count', 'rooms_count']
+FLOAT_COLUMNS = ['home_area', 'season_index']
+# Служебные колонки DataFrame, которых нет в модели Client
+SERVICE_COLUMNS = ['region_group']
+# Префикс колонок с помесячным потреблением: consumption.1, consumption.2, ...
+CONSUMPTION_PREFIX = 'consumption.'
+# Колонки хэша содержимого клиента в фиксированном порядке: разобранные поля
+# (кроме id) и помесячный ряд за месяцы 1..12 (см. content_hash_column)
+HASH_COLUMNS = [
+    'address', 'home_type', 'rooms_count', 'people_count', 'home_area',
+    'summary_electricity', 'avg_monthly_electricity', 'max_monthly_electricity',
+    'min_monthly_electricity', 'electricity_per_sqm', 'electricity_per_person',
+    'is_commercial', 'region', 'building_key',
+] + [CONSUMPTION_PREFIX + str(month) for month in range(1, 13)]
+
+def consumption_columns(df: pd.DataFrame) -> List[str]:
+    """Колонки помесячного потребления (consumption.<месяц>) в DataFrame клиентов"""
+    return [col for col in df.columns if str(col).startswith(CONSUMPTION_PREFIX)]
+
+def consumption_series(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Помесячный ряд потребления в компактном виде: список месяцев и матрица
+    клиенты × месяцы (NaN — нет показания), строки идут в порядке строк df
+    """
+    columns = consumption_columns(df)
+    if not columns:
+        return None
+    return {
+        "months": [col[len(CONSUMPTION_PREFIX):] for col in columns],
+        "values": df[columns].to_numpy(dtype=float, na_value=np.nan),
+    }
+
+def frame_column_values(df: pd.DataFrame, col: str) -> List[Any]:
+    """
+    Приводит колонку DataFrame к списку значений Python: тип приводится
+    один раз для всей колонки, а NaN заменяется на None одной маской
+    """
+    series = df[col]
+    missing = series.isna().to_numpy()
+    if col in INT_COLUMNS:
+        values = np.zeros(len(series), dtype=np.int64)
+        # astype(int64) отбрасывает дробную часть так же, как int(value)
+        values[~missing] = series.to_numpy(dtype=float, na_value=np.nan)[~missing]
+        values = values.astype(object)
+    elif col in FLOAT_COLUMNS:
+        values = series.to_numpy(dtype=float, na_value=np.nan).astype(object)
+    else:
+        values = series.to_numpy(dtype=object, copy=True)
+    if missing.any():
+        values[missing] = None
+    return values.tolist()
+
+def frame_to_rows(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    """
+    Строки DataFrame в виде кортежей значений в порядке columns —
+    готовые параметры для пакетной вставки
+    """
+    return list(zip(*(frame_column_values(df, col) for col in columns)))
+
+def frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Преобразует DataFrame клиентов в список словарей без iterrows
+    и без поячеечных проверок типов. Служебные колонки пропускаются
+    """
+    series_columns = set(consumption_columns(df))
+    columns = [col for col in df.columns if col not in SERVICE_COLUMNS and col not in series_columns]
+    return [dict(zip(columns, row)) for row in frame_to_rows(df, columns)]
+
 def get_commercial_addresses(report_id: int) -> List[str]:
     """
     Получает список адресов из конкретного отчета
@@ -263,74 +409,159 @@ def get_commercial_addresses(report_id: int) -> List[str]:
         print(f"Ошибка при получении адресов из отчета {report_id}: {str(e)}")
         return []
 
-def parse_report_file(file_path_or_data: Union[str, List[Dict]]) -> List[Dict[str, Any]]:
+def parse_report_frame(
+    file_path_or_data: Union[str, List[Dict]],
+    chunk_size: int = RECORDS_CHUNK_SIZE,
+    metrics: Optional[PipelineMetrics] = None
+) -> pd.DataFrame:
+    """
+    Парсит файл отчёта (JSON, CSV или XLSX) или список данных в DataFrame
+    клиентов с нормализованными адресами. Пропуски не заполняются
+    (см. impute_report_frame). Файл читается потоково пачками по chunk_size
+    записей, поэтому в памяти никогда не находится весь файл целиком.
+    В metrics записываются этапы read (получение пачек) и parse
+    """
+    metrics = metrics or PipelineMetrics()
+    # Получаем данные
+    if isinstance(file_path_or_data, str):
+        # Если передан путь к файлу
+        logger.info(f"Потоковое чтение файла, размер: {os.path.getsize(file_path_or_data)} байт")
+        chunks = iter_report_records(file_path_or_data, chunk_size)
+    else:
+        # Если переданы данные напрямую
+        logger.info("Получены данные напрямую")
+        chunks = iter_records(file_path_or_data, chunk_size)
+    
+    # Каждую пачку сразу сворачиваем в DataFrame: исходные словари
+    # клиентов (с помесячным потреблением) в памяти не накапливаются
+    frames = []
+    total_records = 0
+    for chunk in metrics.iterate("read", chunks):
+        with metrics.stage("parse", rows=len(chunk)):
+            frames.append(parse_clients_batch(chunk))
+        total_records += len(chunk)
+        logger.info(f"Обработано записей: {total_records}")
+    
+    if not frames:
+        logger.warning("Записи клиентов не найдены")
+        return pd.DataFrame()
+    
+    with metrics.stage("parse"):
+        logger.info("Объединение пачек в DataFrame")
+        df = pd.concat(frames, ignore_index=True, sort=False) if len(frames) > 1 else frames[0]
+        del frames
+    
+    # Нормализуем адреса: регион и ключ здания сохраняются вместе с клиентом
+    with metrics.stage("normalize_address", rows=len(df)):
+        logger.info("Нормализация адресов")
+        addresses = parse_addresses(df['address'])
+        df['region'] = addresses['region']
+        df['building_key'] = addresses['building_key']
+        # Клиенты без региона группируются вместе
+        df['region_group'] = df['region'].fillna('Unknown')
+    return df
+
+# Поля, пропуски в которых заполняются, и группы для заполнения (от общей к точной)
+IMPUTED_COLUMNS = ['home_area', 'season_index', 'people_count', 'rooms_count']
+IMPUTATION_GROUPS = ['home_type', 'region_group']
+
+def imputation_delta(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Вклад отчёта в общую статистику заполнения: суммы и количества
+    известных значений по группам. Считается по DataFrame до заполнения
+    """
+    stats = group_stats_delta(df, IMPUTED_COLUMNS, IMPUTATION_GROUPS)
+    stats = stats.rename(columns={'region_group': 'region'})
+    return stats.to_dict('records')
+
+def impute_report_frame(df: pd.DataFrame, imputation_stats: Optional[pd.DataFrame] = None) -> pd.DataFrame:
     """
-    Парсит JSON файл отчёта или список данных и возвращает список данных клиентов
+    Заполняет пропуски в DataFrame клиентов на месте.
+    
+    Если передана накопленная по прошлым отчётам статистика (imputation_stats,
+    колонки home_type, region, field, value_sum, value_count), пропуски
+    заполняются её средними одним join на уровень группировки. Иначе —
+    медианами по группам текущего файла, как раньше
+    """
+    logger.info("Заполнение пропущенных значений")
+    if imputation_stats is not None and not imputation_stats.empty:
+        stats = imputation_stats.rename(columns={'region': 'region_group'})
+        return fill_missing_from_stats(df, stats, IMPUTED_COLUMNS, IMPUTATION_GROUPS)
+    return fill_missing_grouped(df, IMPUTED_COLUMNS, group_cols=IMPUTATION_GROUPS)
+
+def load_report_frame(
+    file_path: str,
+    chunk_size: int = RECORDS_CHUNK_SIZE,
+    metrics: Optional[PipelineMetrics] = None
+) -> pd.DataFrame:
+    """
+    Разобранный DataFrame клиентов загруженного файла (до заполнения пропусков):
+    из колоночного кэша рядом с файлом, если он есть, иначе файл парсится
+    и кэш создаётся. Повторные проверки, выгрузки и аналитика не парсят файл заново
+    """
+    metrics = metrics or PipelineMetrics()
+    with metrics.stage("read_cache") as span:
+        df = read_report_cache(file_path)
+        span["rows"] = len(df) if df is not None else 0
+    if df is None:
+        df = parse_report_frame(file_path, chunk_size, metrics)
+        if not df.empty:
+            with metrics.stage("write_cache", rows=len(df)):
+                write_report_cache(file_path, df)
+    return df
+
+def parsed_report_frame(
+    file_path_or_data: Union[str, List[Dict]],
+    chunk_size: int = RECORDS_CHUNK_SIZE,
+    metrics: Optional[PipelineMetrics] = None
+) -> pd.DataFrame:
+    """Разобранный DataFrame клиентов из файла (через кэш) или из уже загруженных данных"""
+    if isinstance(file_path_or_data, str):
+        return load_report_frame(file_path_or_data, chunk_size, metrics)
+    return parse_report_frame(file_path_or_data, chunk_size, metrics)
+
+def report_frame(
+    file_path_or_data: Union[str, List[Dict]],
+    chunk_size: int = RECORDS_CHUNK_SIZE,
+    imputation_stats: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """DataFrame клиентов с заполненными пропусками"""
+    df = parsed_report_frame(file_path_or_data, chunk_size)
+    if df.empty:
+        return df
+    return impute_report_frame(df, imputation_stats)
+
+def content_hash_column(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-битный хэш содержимого каждого клиента по HASH_COLUMNS. Список колонок
+    и их порядок фиксированы: колонка, которой нет в этом файле (например,
+    месяц без показаний ни у одного клиента), хэшируется как пустое значение,
+    поэтому хэш клиента не зависит от состава остальных клиентов файла.
+    Считается до заполнения пропусков, а значения приводятся так же, как в
+    записях для БД — хэш не зависит от того, пришёл файл из кэша или из JSON
+    """
+    missing = pd.Series([None] * len(df), dtype=object).astype(str)
+    parts = [
+        pd.Series(frame_column_values(df, col), dtype=object).astype(str) if col in df.columns else missing
+        for col in HASH_COLUMNS
+    ]
+    joined = parts[0].str.cat(parts[1:], sep='\x1f')
+    return pd.util.hash_pandas_object(joined, index=False).to_numpy().view(np.int64)
+
+def parse_report_file(file_path_or_data: Union[str, List[Dict]], chunk_size: int = RECORDS_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """
+    Парсит JSON файл отчёта или список данных и возвращает список данных клиентов.
+    Для файла используется колоночный кэш (см. load_report_frame)
     """
     logger.info(f"Начало парсинга данных")
     try:
-        # Получаем данные
-        if isinstance(file_path_or_data, str):
-            # Если передан путь к файлу
-            with open(file_path_or_data, 'r', encoding='utf-8') as f:
-                report_data = json.load(f)
-            logger.info(f"Файл успешно прочитан, размер данных: {len(str(report_data))} байт")
-        else:
-            # Если переданы данные напрямую
-            report_data = file_path_or_data
-            logger.info(f"Получены данные напрямую, размер данных: {len(str(report_data))} байт")
-            
-        # Предполагаем, что данные клиентов находятся в списке
-        if isinstance(report_data, list):
-            logger.info(f"Данные в формате списка, количество записей: {len(report_data)}")
-            clients_data = [parse_client_data(client) for client in report_data]
-        # Если данные вложены в объект
-        elif isinstance(report_data, dict):
-            logger.info("Данные в формате словаря, поиск списка клиентов")
-            # Ищем ключ, содержащий список клиентов
-            for key, value in report_data.items():
-                if isinstance(value, list):
-                    logger.info(f"Найден список клиентов в ключе {key}, количество записей: {len(value)}")
-                    clients_data = [parse_client_data(client) for client in value]
-                    break
-        else:
-            logger.warning(f"Неизвестный формат данных: {type(report_data)}")
-            clients_data = []
-            
-        # Преобразуем в DataFrame для заполнения пропусков
-        logger.info("Преобразование данных в DataFrame")
-        df = pd.DataFrame(clients_data)
-        
-        # Извлекаем регион из адреса для группировки
-        logger.info("Извлечение регионов из адресов для группировки")
-        df['region'] = df['address'].apply(lambda x: x.split(',')[0].strip() if pd.notna(x) and ',' in x else 'Unknown')
-        
-        # Заполняем пропуски медианными значениями для числовых полей
-        logger.info("Заполнение пропущенных значений")
-        numeric_columns = ['home_area', 'season_index', 'people_count', 'rooms_count']
-        for col in numeric_columns:
-            if col in df.columns:
-                logger.info(f"Заполнение пропусков для колонки: {col}")
-                df = fill_missing_by_group(df, col, group_cols=['home_type', 'region'])
+        df = report_frame(file_path_or_data, chunk_size)
+        if df.empty:
+            return []
         
         # Преобразуем DataFrame обратно в список словарей
         logger.info("Преобразование DataFrame обратно в список словарей")
-        result = []
-        for _, row in df.iterrows():
-            record = {}
-            for col in df.columns:
-                if col == 'region':  # Пропускаем поле region
-                    continue
-                value = row[col]
-                if pd.isna(value):
-                    record[col] = None
-                elif col in ['people_count', 'rooms_count']:
-                    record[col] = int(value) if value is not None else None
-                elif col in ['home_area', 'season_index']:
-                    record[col] = float(value) if value is not None else None
-                else:
-                    record[col] = value
-            result.append(record)
+        result = frame_to_records(df)
         
         logger.info(f"Парсинг данных завершен, обработано записей: {len(result)}")
         return result
@@ -354,11 +585,127 @@ def process_report(file_path_or_data: Union[str, List[Dict]], report_id: int) ->
     clients_data = parse_report_file(file_path_or_data)
     logger.info(f"Создание объектов Client для отчета {report_id}")
     clients = [
-        Client(
-            **{k: v for k, v in client_data.items() if k != 'region'},
-            report_id=report_id
-        )
+        Client(**client_data, report_id=report_id)
         for client_data in clients_data
     ]
     logger.info(f"Обработка отчета {report_id} завершена, создано объектов: {len(clients)}")
-    return clients 
\ No newline at end of file
+    return clients
+
+def prepare_report_frame(
+    file_path_or_data: Union[str, List[Dict]],
+    imputation_stats: Optional[pd.DataFrame],
+    metrics: PipelineMetrics
+) -> tuple:
+    """
+    Разобранный DataFrame клиентов с хэшем содержимого и заполненными
+    пропусками, готовый к преобразованию в записи для БД
+
+    Returns:
+        (DataFrame, вклад файла в статистику заполнения — см. imputation_delta)
+    """
+    df = parsed_report_frame(file_path_or_data, metrics=metrics)
+    if df.empty:
+        return df, []
+    # Хэш содержимого позволяет при записи пропустить не изменившихся клиентов
+    with metrics.stage("hash", rows=len(df)):
+        content_hash = content_hash_column(df)
+    with metrics.stage("impute", rows=len(df)):
+        imputation = imputation_delta(df)
+        impute_report_frame(df, imputation_stats)
+    df['content_hash'] = content_hash
+    return df, imputation
+
+def prepared_frame_records(df: pd.DataFrame, report_id: int, metrics: PipelineMetrics) -> Dict[str, Any]:
+    """
+    Записи клиентов с report_id и их помесячный ряд из подготовленного DataFrame.
+    Новые и изменившиеся клиенты при записи встают в очередь проверки на фрод
+    (неизменившиеся не перезаписываются, поэтому их состояние сохраняется).
+    Аренда сбрасывается: воркер, проверявший прежние данные клиента,
+    не перезапишет новую постановку в очередь своим результатом
+    """
+    with metrics.stage("convert", rows=len(df)):
+        records = frame_to_records(df)
+        consumption = consumption_series(df)
+        for record in records:
+            record['report_id'] = report_id
+            record['frod_state'] = FROD_PENDING_STATE
+            record['frod_lease_owner'] = None
+            record['frod_lease_until'] = None
+    return {"records": records, "consumption": consumption}
+
+def process_report_records(
+    file_path_or_data: Union[str, List[Dict]],
+    report_id: int,
+    imputation_stats: Optional[pd.DataFrame] = None
+) -> Dict[str, Any]:
+    """
+    Обрабатывает отчёт и возвращает записи клиентов в виде словарей
+    с хэшем содержимого для пакетной записи в базу (см. utils.bulk.upsert_changed_clients)
+    
+    Args:
+        file_path_or_data: Путь к файлу или список данных
+        report_id: ID отчета
+        imputation_stats: Накопленная статистика для заполнения пропусков
+            (см. impute_report_frame), None — заполнять по самому файлу
+    
+    Returns:
+        Словарь:
+            records — записи клиентов с проставленным report_id;
+            consumption — помесячный ряд (см. consumption_series), строки соответствуют records;
+            imputation — вклад файла в статистику заполнения (см. imputation_delta);
+            metrics — замеры этапов обработки в процессе (см. utils.metrics.PipelineMetrics)
+    """
+    logger.info(f"Начало обработки отчета {report_id}")
+    metrics = PipelineMetrics()
+    result = {"records": [], "consumption": None, "imputation": [], "metrics": []}
+    try:
+        df, result["imputation"] = prepare_report_frame(file_path_or_data, imputation_stats, metrics)
+        if not df.empty:
+            result.update(prepared_frame_records(df, report_id, metrics))
+    except Exception as e:
+        logger.error(f"Ошибка при обработке отчета {report_id}: {str(e)}", exc_info=True)
+        return {"records": [], "consumption": None, "imputation": [], "metrics": metrics.to_list()}
+    result["metrics"] = metrics.to_list()
+    logger.info(f"Обработка отчета {report_id} завершена, подготовлено записей: {len(result['records'])}")
+    return result
+
+def prepare_report_file(
+    file_path: str,
+    output_path: str,
+    imputation_stats: Optional[pd.DataFrame] = None,
+    batch_size: int = RECORDS_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Первый этап пакетной записи большого файла: парсит его, считает хэши,
+    заполняет пропуски и сохраняет результат в output_path группами по
+    batch_size строк (см. report_cache.write_prepared_frame). Сами записи
+    клиентов не возвращаются — их читают пачками через prepared_batch_records,
+    поэтому ни воркер, ни API не держат весь файл в виде словарей
+
+    Returns:
+        Словарь: rows — количество клиентов, imputation — вклад файла
+        в статистику заполнения, metrics — замеры этапов
+    """
+    logger.info(f"Подготовка файла {file_path} к пакетной записи")
+    metrics = PipelineMetrics()
+    df, imputation = prepare_report_frame(file_path, imputation_stats, metrics)
+    if not df.empty:
+        with metrics.stage("write_prepared", rows=len(df)):
+            write_prepared_frame(output_path, df, batch_size)
+    logger.info(f"Файл {file_path} подготовлен, клиентов: {len(df)}")
+    return {"rows": len(df), "imputation": imputation, "metrics": metrics.to_list()}
+
+def prepared_batch_records(prepared_path: str, report_id: int, start: int, stop: int) -> Dict[str, Any]:
+    """
+    Записи клиентов [start, stop) из подготовленного файла (см. prepare_report_file)
+
+    Returns:
+        Словарь: records, consumption (как в process_report_records) и metrics
+    """
+    metrics = PipelineMetrics()
+    with metrics.stage("read_prepared") as span:
+        df = read_prepared_rows(prepared_path, start, stop)
+        span["rows"] = len(df)
+    result = prepared_frame_records(df, report_id, metrics)
+    result["metrics"] = metrics.to_list()
+    return result
@@ -1,5 +1,5 @@
 import pandas as pd
-from fill_missing import fill_missing_by_group
+from fill_missing import fill_missing_grouped
 
 # Загрузка тестового и трэин набора
 test_data = pd.read_json('dataset_test.json')
@@ -11,30 +11,14 @@ test_data['region'] = test_data['address'].apply(lambda x: x.split(',')[0].strip
 # Извлечение региона из address
 train_data['region'] = train_data['address'].apply(lambda x: x.split(',')[0].strip() if ',' in x else 'Unknown')
 
-# Заполнение пропусков, используя средние из train_data
-for col in ['roomsCount', 'residentsCount', 'totalArea']:
-    # Вычисляем средние из обучающего набора
-    group_means = train_data.groupby(['buildingType', 'region'])[col].mean()
-    building_means = train_data.groupby('buildingType')[col].mean()
-    global_mean = train_data[col].mean()
+# Заполнение пропусков, используя средние из train_data:
+# (buildingType, region) → buildingType → среднее по всему набору
+fill_columns = ['roomsCount', 'residentsCount', 'totalArea']
+fill_missing_grouped(test_data, fill_columns, ['buildingType', 'region'],
+                     hierarchical=True, agg='mean', reference=train_data, round_decimals=None)
 
-
-    def fill_test_row(row):
-        if pd.isna(row[col]):
-            try:
-                return group_means.get((row['buildingType'], row['region']),
-                                       building_means.get(row['buildingType'], global_mean))
-            except:
-                return global_mean
-        return row[col]
-
-
-    test_data[col] = test_data.apply(fill_test_row, axis=1)
-
-
-# Применяем к каждому столбцу
-for col in ['roomsCount', 'residentsCount', 'totalArea']:
-    train_data = fill_missing_by_group(train_data, col)
+# Применяем ко всем столбцам сразу
+fill_missing_grouped(train_data, fill_columns, ['buildingType', 'region'])
 
 # Шаг 3: Проверка результата
 print("Пропуски в тестовом наборе:")
@@ -0,0 +1,138 @@
+import logging
+import os
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # без pyarrow отчёты просто каждый раз парсятся заново
+    pa = None
+    pq = None
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Версию нужно увеличивать при изменении набора или смысла колонок кэша
+CACHE_VERSION = "6"
+CACHE_SUFFIX = ".clients.parquet"
+
+
+def cache_path(file_path: str) -> str:
+    """Путь к колоночному кэшу рядом с загруженным файлом"""
+    return file_path + CACHE_SUFFIX
+
+
+def _source_metadata(file_path: str) -> dict:
+    stat = os.stat(file_path)
+    return {
+        b"cache_version": CACHE_VERSION.encode(),
+        b"source_size": str(stat.st_size).encode(),
+        b"source_mtime_ns": str(stat.st_mtime_ns).encode(),
+    }
+
+
+def has_report_cache(file_path: str) -> bool:
+    """
+    Есть ли актуальный кэш: та же версия формата и тот же исходный файл
+    (размер и время изменения), что и при записи кэша
+    """
+    if pq is None or not os.path.exists(cache_path(file_path)):
+        return False
+    try:
+        metadata = pq.read_schema(cache_path(file_path)).metadata or {}
+        expected = _source_metadata(file_path)
+        return all(metadata.get(key) == value for key, value in expected.items())
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать кэш {cache_path(file_path)}: {str(e)}")
+        return False
+
+
+def read_report_cache(file_path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """
+    Читает нормализованные колонки клиентов из кэша через memory map.
+    Возвращает None, если кэша нет или он устарел
+    """
+    if not has_report_cache(file_path):
+        return None
+    table = pq.read_table(cache_path(file_path), columns=columns, memory_map=True)
+    logger.info(f"Клиенты загружены из кэша {cache_path(file_path)}, записей: {table.num_rows}")
+    return table.to_pandas()
+
+
+def write_report_cache(file_path: str, df: pd.DataFrame) -> Optional[str]:
+    """
+    Сохраняет DataFrame клиентов в Parquet рядом с исходным файлом.
+    Запись атомарная: сначала во временный файл, затем переименование
+    """
+    if pq is None:
+        return None
+    path = cache_path(file_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **_source_metadata(file_path)})
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Кэш клиентов записан: {path}")
+        return path
+    except Exception as e:
+        logger.warning(f"Не удалось записать кэш {path}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+PREPARED_SUFFIX = ".prepared.parquet"
+
+
+def prepared_path(file_path: str, report_id: int) -> str:
+    """
+    Путь к подготовленным к записи клиентам файла (после хэша и заполнения
+    пропусков). Для каждого отчета свой файл, так как заполнение пропусков
+    зависит от статистики на момент проверки
+    """
+    return f"{file_path}.report{report_id}{PREPARED_SUFFIX}"
+
+
+def write_prepared_frame(path: str, df: pd.DataFrame, row_group_size: int) -> str:
+    """
+    Сохраняет подготовленный DataFrame клиентов группами строк по row_group_size,
+    чтобы пачку для записи в БД можно было прочитать, не загружая весь файл.
+    Без pyarrow DataFrame сохраняется через pickle
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if pq is None:
+        df.to_pickle(tmp_path)
+    else:
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, row_group_size=row_group_size)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_prepared_rows(path: str, start: int, stop: int) -> pd.DataFrame:
+    """Строки [start, stop) подготовленного DataFrame, читаются только нужные группы строк"""
+    if pq is None:
+        return pd.read_pickle(path).iloc[start:stop].reset_index(drop=True)
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    groups = []
+    group_start = 0
+    first_row = None
+    for index in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(index).num_rows
+        if group_start < stop and group_start + group_rows > start:
+            if first_row is None:
+                first_row = group_start
+            groups.append(index)
+        group_start += group_rows
+    if not groups:
+        return parquet_file.schema_arrow.empty_table().to_pandas()
+    table = parquet_file.read_row_groups(groups)
+    return table.slice(start - first_row, stop - start).to_pandas()
+
+
+def remove_prepared_frame(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
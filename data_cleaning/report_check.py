@@ -0,0 +1,454 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from utils.bulk import add_imputation_stats, load_imputation_stats, upsert_changed_clients
+from utils.config import (
+    CLIENTS_COMMIT_BATCH_SIZE,
+    PROCESS_TIMEOUT,
+    REPORT_FILE_CONCURRENCY,
+    REPORT_WORKER_MAX_TASKS,
+    REPORT_WORKERS,
+    UPLOAD_DIR,
+)
+from utils.database import async_session_maker
+from utils.frod_queue import notify_frod_check
+from utils.metrics import PipelineMetrics
+from utils.models import Client, File, Report, ReportJob
+from utils.process_pool import ReportProcessPool
+from .parse_report import prepare_report_file, prepared_batch_records
+from .report_cache import prepared_path, remove_prepared_frame
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+# Сколько раз повторять запись файла, если его транзакция попала во взаимную
+# блокировку с транзакцией другого файла (общие клиенты в нескольких файлах)
+FILE_WRITE_RETRIES = 3
+DEADLOCK_SQLSTATES = ("40P01", "40001")
+
+# Парсинг отчётов выполняется в отдельных процессах, а не в потоках API
+report_pool = ReportProcessPool(REPORT_WORKERS, REPORT_WORKER_MAX_TASKS)
+
+
+def file_path_from_url(file_url: str) -> str:
+    """Путь к загруженному файлу на диске по его публичному URL"""
+    return os.path.join(UPLOAD_DIR, file_url.split('/')[-1])
+
+
+async def update_job(job_id: int, **fields: Any) -> None:
+    """
+    Сохраняет прогресс задачи в отдельной короткой транзакции,
+    чтобы он был виден через /report/{id}/status во время обработки
+    """
+    async with async_session_maker() as session:
+        await session.execute(update(ReportJob).where(ReportJob.id == job_id).values(**fields))
+        await session.commit()
+
+
+async def increment_job(job_id: int, **deltas: int) -> None:
+    """Атомарно увеличивает счётчики прогресса задачи"""
+    values = {name: getattr(ReportJob, name) + delta for name, delta in deltas.items()}
+    await update_job(job_id, **values)
+
+
+async def refresh_report_stats(db: AsyncSession, report_id: int) -> Dict[str, Any]:
+    """
+    Пересчитывает агрегаты отчета одним GROUP BY по clients.report_id
+    (по индексу) и сохраняет их в reports. Коммит остаётся за вызывающим кодом
+    """
+    query = (
+        select(
+            func.count(Client.id),
+            func.count(Client.id).filter(Client.is_commercial.is_(True)),
+            func.count(Client.id).filter(Client.is_commercial.is_(False)),
+            func.coalesce(func.sum(Client.home_area), 0.0),
+            func.coalesce(func.sum(Client.summary_electricity), 0.0),
+        )
+        .where(Client.report_id == report_id)
+        .group_by(Client.report_id)
+    )
+    result = await db.execute(query)
+    row = result.first() or (0, 0, 0, 0.0, 0.0)
+    stats = {
+        "total_clients": row[0],
+        "commercial_clients": row[1],
+        "residential_clients": row[2],
+        "total_area": row[3],
+        "total_consumption": row[4],
+    }
+    await db.execute(
+        update(Report)
+        .where(Report.id == report_id)
+        .values(
+            all_count=stats["total_clients"],
+            commercial_count=stats["commercial_clients"],
+            residential_count=stats["residential_clients"],
+            total_area=stats["total_area"],
+            total_consumption=stats["total_consumption"],
+            stats_updated_at=datetime.now(timezone.utc),
+        )
+    )
+    return stats
+
+
+def report_stats(report: Report) -> Dict[str, Any]:
+    """Сохранённые агрегаты отчета без пересчёта по клиентам"""
+    return {
+        "report_id": report.id,
+        "is_ready": report.is_ready,
+        "total_clients": report.all_count,
+        "commercial_clients": report.commercial_count,
+        "residential_clients": report.residential_count,
+        "total_area": report.total_area,
+        "total_consumption": report.total_consumption,
+        "stats_updated_at": report.stats_updated_at,
+    }
+
+
+def is_deadlock(error: DBAPIError) -> bool:
+    """Ошибка PostgreSQL, после которой транзакцию можно просто повторить"""
+    return getattr(error.orig, "sqlstate", None) in DEADLOCK_SQLSTATES
+
+
+def job_progress(job: ReportJob) -> Dict[str, Any]:
+    """
+    Прогресс задачи: скорость записи клиентов и оценка оставшегося времени.
+    Пока не все файлы разобраны, общее число клиентов неизвестно, поэтому
+    ETA считается по доле обработанных байт
+    """
+    throughput = None
+    eta = None
+    if job.started_at:
+        end = job.finished_at or datetime.now(timezone.utc)
+        elapsed = (end - job.started_at).total_seconds()
+        if elapsed > 0 and job.rows_processed:
+            throughput = job.rows_processed / elapsed
+        if job.status == "running" and elapsed > 0:
+            if job.files_processed == job.files_total and job.rows_total and throughput:
+                eta = max(job.rows_total - job.rows_processed, 0) / throughput
+            elif job.bytes_processed:
+                eta = elapsed * max(job.bytes_total - job.bytes_processed, 0) / job.bytes_processed
+    return {
+        "job_id": job.id,
+        "report_id": job.report_id,
+        "status": job.status,
+        "stage": job.stage,
+        "files_total": job.files_total,
+        "files_processed": job.files_processed,
+        "rows_total": job.rows_total,
+        "rows_processed": job.rows_processed,
+        "throughput_rows_per_sec": round(throughput, 2) if throughput else None,
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        "result": job.result,
+        "metrics": (job.metrics or {}).get("report"),
+    }
+
+
+def job_metrics(job: ReportJob) -> Dict[str, Any]:
+    """Замеры этапов задачи: суммарно по отчету и отдельно по каждому файлу"""
+    metrics = job.metrics or {}
+    return {
+        "job_id": job.id,
+        "report_id": job.report_id,
+        "status": job.status,
+        "report": metrics.get("report", []),
+        "files": metrics.get("files", {}),
+    }
+
+
+async def run_report_check(job_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Выполняет задачу проверки отчёта: парсит необработанные файлы
+    и записывает клиентов в базу. Работает в фоне: каждый файл пишется
+    и фиксируется в своей транзакции, агрегаты отчёта — в отдельной,
+    прогресс пишется в report_jobs
+    """
+    async with async_session_maker() as db:
+        job = await db.get(ReportJob, job_id)
+        if not job:
+            logger.error(f"Задача {job_id} не найдена")
+            return None
+        report_id = job.report_id
+        timeout = job.timeout or PROCESS_TIMEOUT
+        logger.info(f"Запуск задачи {job_id}: обработка отчета {report_id} с таймаутом {timeout} секунд")
+
+        # Получаем все необработанные файлы отчета
+        query = select(File).where(File.report_id == report_id, File.is_parsed == False)
+        result = await db.execute(query)
+        # Один и тот же blob, загруженный в отчет несколько раз, обрабатываем однажды
+        files_by_blob: Dict[str, List[File]] = {}
+        for file in result.scalars().all():
+            files_by_blob.setdefault(file.s3_url, []).append(file)
+        files = [blob_files[0] for blob_files in files_by_blob.values()]
+
+        file_sizes = {
+            file.id: os.path.getsize(file_path_from_url(file.s3_url))
+            for file in files
+            if os.path.exists(file_path_from_url(file.s3_url))
+        }
+        job.status = "running"
+        job.stage = "parsing"
+        job.started_at = datetime.now(timezone.utc)
+        # Статистика заполнения пропусков, накопленная по прошлым отчетам.
+        # Пока она пуста, пропуски заполняются по каждому файлу отдельно
+        imputation_stats = await load_imputation_stats(db)
+        if imputation_stats.empty:
+            imputation_stats = None
+            logger.info("Статистика заполнения пропусков пуста, заполнение по файлам")
+
+        job.files_total = len(files)
+        job.bytes_total = sum(file_sizes.values())
+        # Возобновлённая задача начинает отсчёт прогресса заново
+        job.files_processed = 0
+        job.bytes_processed = 0
+        job.rows_total = 0
+        job.rows_processed = 0
+        job.error = None
+        await db.commit()
+
+        report_totals: Dict[str, Any] = {}
+        # Замеры этапов: по каждому файлу и суммарно по отчету
+        report_metrics = PipelineMetrics()
+        file_metrics: Dict[str, Dict[str, Any]] = {}
+        unchanged_clients = 0
+        inserted_clients = 0
+        updated_clients = 0
+        processed_files = 0
+        failed_files = 0
+
+        def metrics() -> Dict[str, Any]:
+            return {"report": report_metrics.to_list(), "files": file_metrics}
+
+        def statistics() -> Dict[str, Any]:
+            return {
+                **report_totals,
+                "unchanged_clients": unchanged_clients,
+                "inserted_clients": inserted_clients,
+                "updated_clients": updated_clients,
+                "processed_files": processed_files,
+                "failed_files": failed_files
+            }
+
+        # Каждый файл пишется в своей сессии и транзакции; одновременно
+        # обрабатывается не больше REPORT_FILE_CONCURRENCY файлов
+        file_semaphore = asyncio.Semaphore(REPORT_FILE_CONCURRENCY)
+
+        async def write_batch(
+            file: File,
+            batch: Dict[str, Any],
+            checkpoint: int,
+            imputation: Optional[List[Dict[str, Any]]],
+            spans: PipelineMetrics
+        ) -> Dict[str, int]:
+            """
+            Записывает пачку клиентов файла в отдельной транзакции вместе с точкой
+            возобновления files.parsed_rows. Последняя пачка (imputation не None)
+            в той же транзакции добавляет статистику заполнения и отмечает файл
+            и его копии в отчете обработанными. После сбоя запись продолжается
+            с первой незафиксированной пачки
+            """
+            clients = batch["records"]
+            blob_file_ids = [blob_file.id for blob_file in files_by_blob[file.s3_url]]
+            values = {"parsed_rows": checkpoint}
+            async with async_session_maker() as session:
+                # Сохраняем новых и изменившихся клиентов пачками INSERT ... ON CONFLICT
+                with spans.stage("upsert", rows=len(clients)):
+                    counts = await upsert_changed_clients(session, clients, consumption=batch["consumption"])
+                # Новые и изменившиеся клиенты ждут проверки на фрод — будим её после коммита
+                if counts["inserted"] or counts["updated"]:
+                    await notify_frod_check(session, counts["inserted"] + counts["updated"])
+
+                if imputation is not None:
+                    # Вклад файла в статистику заполнения пропусков, один раз на содержимое
+                    if imputation:
+                        with spans.stage("imputation_stats", rows=len(imputation)):
+                            await add_imputation_stats(session, file.sha256 or file.s3_url, imputation)
+                    values["is_parsed"] = True
+
+                await session.execute(update(File).where(File.id.in_(blob_file_ids)).values(**values))
+                with spans.stage("commit", rows=len(clients)):
+                    await session.commit()
+            return counts
+
+        async def process_single_file(file: File) -> bool:
+            async with file_semaphore:
+                return await process_file(file)
+
+        async def process_file(file: File) -> bool:
+            nonlocal unchanged_clients, inserted_clients, updated_clients, processed_files, failed_files
+            file_path = file_path_from_url(file.s3_url)
+            output_path = prepared_path(file_path, report_id)
+            spans = PipelineMetrics()
+            try:
+                # Проверяем существование файла
+                if file.id not in file_sizes:
+                    raise FileNotFoundError(f"Файл не найден: {file_path}")
+
+                logger.info(f"Начало обработки файла: {file_path}, размер: {file_sizes[file.id]} байт")
+                try:
+                    # Файл разбирается один раз и сохраняется на диск готовым к записи,
+                    # записи клиентов затем читаются пачками по CLIENTS_COMMIT_BATCH_SIZE.
+                    # По таймауту процесс-воркер убивается, а не продолжает работать в фоне.
+                    # process включает этапы воркера, ожидание пула и передачу данных
+                    with spans.stage("process") as span:
+                        prepared = await report_pool.run(
+                            prepare_report_file,
+                            file_path,
+                            output_path,
+                            imputation_stats,
+                            CLIENTS_COMMIT_BATCH_SIZE,
+                            timeout=timeout
+                        )
+                        span["rows"] = prepared["rows"]
+                    spans.merge(prepared["metrics"])
+                    total_rows = prepared["rows"]
+                    logger.info(f"Файл обработан, получено клиентов: {total_rows}")
+                except asyncio.TimeoutError:
+                    logger.error(f"Таймаут при обработке файла: {file_path} (таймаут: {timeout} сек)")
+                    raise Exception(f"Превышено время обработки файла ({timeout} сек)")
+
+                # Пачки, записанные до остановки, повторно не пишутся
+                written_rows = min(file.parsed_rows or 0, total_rows)
+                if written_rows:
+                    logger.info(f"Возобновление записи файла {file_path} с клиента {written_rows} из {total_rows}")
+                await increment_job(job_id, rows_total=total_rows, rows_processed=written_rows)
+                await update_job(job_id, stage="writing")
+
+                file_counts = {"unchanged": 0, "inserted": 0, "updated": 0, "consumption_values": 0}
+                batch_starts = list(range(written_rows, total_rows, CLIENTS_COMMIT_BATCH_SIZE)) or [total_rows]
+                for batch_start in batch_starts:
+                    batch_stop = min(batch_start + CLIENTS_COMMIT_BATCH_SIZE, total_rows)
+                    is_last = batch_stop == total_rows
+                    if batch_stop > batch_start:
+                        with spans.stage("read_batch", rows=batch_stop - batch_start):
+                            batch = await report_pool.run(
+                                prepared_batch_records, output_path, report_id, batch_start, batch_stop, timeout=timeout
+                            )
+                        spans.merge(batch.pop("metrics"))
+                    else:
+                        batch = {"records": [], "consumption": None}
+
+                    for attempt in range(1, FILE_WRITE_RETRIES + 1):
+                        try:
+                            counts = await write_batch(
+                                file, batch, batch_stop, prepared["imputation"] if is_last else None, spans
+                            )
+                            break
+                        except DBAPIError as e:
+                            if not is_deadlock(e) or attempt == FILE_WRITE_RETRIES:
+                                raise
+                            logger.warning(f"Взаимная блокировка при записи файла {file_path}, повтор {attempt}")
+                    del batch
+                    for name, value in counts.items():
+                        file_counts[name] += value
+                    unchanged_clients += counts["unchanged"]
+                    inserted_clients += counts["inserted"]
+                    updated_clients += counts["updated"]
+                    await increment_job(job_id, rows_processed=batch_stop - batch_start)
+
+                logger.info(
+                    f"Клиенты сохранены: добавлено {file_counts['inserted']}, обновлено {file_counts['updated']}, "
+                    f"без изменений {file_counts['unchanged']}, помесячных значений: {file_counts['consumption_values']}"
+                )
+                processed_files += 1
+                await increment_job(job_id, files_processed=1, bytes_processed=file_sizes[file.id])
+                logger.info(f"Файл успешно обработан: {file_path}")
+                return True
+            except Exception as e:
+                logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}", exc_info=True)
+                failed_files += 1
+                await increment_job(job_id, files_processed=1, bytes_processed=file_sizes.get(file.id, 0))
+                return False
+            finally:
+                remove_prepared_frame(output_path)
+                file_metrics[str(file.id)] = {"file": file.s3_url, "stages": spans.to_list()}
+                report_metrics.merge(file_metrics[str(file.id)]["stages"])
+                await update_job(job_id, metrics=metrics())
+
+        try:
+            if files:
+                logger.info(f"Запуск параллельной обработки {len(files)} файлов, одновременно: {REPORT_FILE_CONCURRENCY}")
+                await asyncio.gather(*(process_single_file(file) for file in files))
+                logger.info("Параллельная обработка завершена")
+
+            # Агрегаты отчета считаем в БД по уже записанным клиентам
+            await update_job(job_id, stage="finalizing")
+            with report_metrics.stage("stats"):
+                report_totals.update(await refresh_report_stats(db, report_id))
+            report = await db.get(Report, report_id)
+            if report:
+                report.is_ready = True
+            await db.commit()
+
+            logger.info(f"Обработка завершена. Статистика: обработано файлов: {processed_files}, ошибок: {failed_files}")
+            await update_job(
+                job_id,
+                status="done",
+                stage="done",
+                result=statistics(),
+                metrics=metrics(),
+                finished_at=datetime.now(timezone.utc),
+            )
+            return statistics()
+
+        except Exception as e:
+            logger.error(f"Критическая ошибка при обработке отчета {report_id}: {str(e)}", exc_info=True)
+            await db.rollback()
+            # Обновляем статус отчета в случае ошибки
+            report = await db.get(Report, report_id)
+            if report:
+                report.is_ready = False
+                await db.commit()
+            await update_job(
+                job_id,
+                status="failed",
+                stage="failed",
+                error=str(e),
+                result=statistics(),
+                metrics=metrics(),
+                finished_at=datetime.now(timezone.utc),
+            )
+            return None
+
+
+async def resume_report_jobs() -> None:
+    """
+    Перезапускает задачи, которые не успели завершиться до остановки API.
+    Уже обработанные файлы (is_parsed) повторно не парсятся, а у файлов,
+    запись которых прервалась, уже зафиксированные пачки (parsed_rows) не пишутся заново
+    """
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(ReportJob.id).where(ReportJob.status.in_(ACTIVE_JOB_STATUSES)).order_by(ReportJob.id)
+        )
+        job_ids = result.scalars().all()
+
+    for job_id in job_ids:
+        logger.info(f"Возобновление задачи проверки отчета {job_id}")
+        await update_job(job_id, status="queued", stage="queued")
+        schedule_report_check(job_id)
+
+
+_running_jobs = set()
+
+
+def schedule_report_check(job_id: int) -> asyncio.Task:
+    """Запускает задачу в фоне текущего event loop"""
+    task = asyncio.create_task(run_report_check(job_id))
+    # Держим ссылку на задачу, иначе её может собрать GC
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return task
@@ -0,0 +1,268 @@
+import csv
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO
+
+try:
+    import openpyxl
+except ImportError:  # без openpyxl XLSX отчёты не принимаются
+    openpyxl = None
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+READ_BUFFER_SIZE = 1 << 20  # сколько символов читаем с диска за раз
+RECORDS_CHUNK_SIZE = 5000  # сколько записей клиентов отдаём за раз
+CSV_SNIFF_SIZE = 64 * 1024  # по какому объёму начала файла определяется разделитель CSV
+
+# Форматы отчётов, которые принимает загрузка и проверка
+SUPPORTED_EXTENSIONS = ('json', 'csv', 'xlsx')
+# В табличных форматах помесячное потребление лежит в колонках consumption.<месяц>
+TABLE_CONSUMPTION_PREFIX = 'consumption.'
+
+_WHITESPACE = " \t\n\r"
+# Символы, которыми может продолжаться число: после целого значения в JSON их не бывает
+_NUMBER_CONTINUATION = "0123456789.eE+-"
+
+
+class _JsonStream:
+    """
+    Инкрементальный разбор JSON из файла: в памяти держится только
+    небольшой буфер, а значения декодируются по одному через raw_decode
+    """
+
+    def __init__(self, f: TextIO, buffer_size: int = READ_BUFFER_SIZE):
+        self._f = f
+        self._buffer_size = buffer_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Дочитывает следующий кусок файла, отбрасывая уже разобранную часть буфера"""
+        if self._eof:
+            return False
+        data = self._f.read(self._buffer_size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Возвращает следующий значимый символ (без пробелов) или None в конце файла"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return None
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Ожидался символ '{char}' в позиции {self._pos}")
+        self._pos += 1
+
+    def decode(self) -> Any:
+        """Декодирует одно JSON-значение, при необходимости дочитывая файл"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Число на границе буфера могло быть обрезано ("1.", "1.5e") — если за
+            # значением нет разделителя, дочитываем и повторяем
+            if (end == len(self._buf) or self._buf[end] in _NUMBER_CONTINUATION) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """Отдаёт элементы массива, начинающегося в текущей позиции"""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.decode()
+            char = self.peek()
+            self._pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Ожидался ',' или ']' в позиции {self._pos - 1}")
+
+    def seek_first_list_in_object(self) -> bool:
+        """
+        Пропускает ключи объекта до первого значения-списка.
+        Возвращает True, если поток стоит на начале такого списка
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            return False
+        while True:
+            key = self.decode()
+            self.expect(':')
+            if self.peek() == '[':
+                logger.info(f"Найден список клиентов в ключе {key}")
+                return True
+            self.decode()
+            char = self.peek()
+            self._pos += 1
+            if char == '}':
+                return False
+            if char != ',':
+                raise ValueError(f"Ожидался ',' или '}}' в позиции {self._pos - 1}")
+
+
+def _chunked(items: Iterator[Any], chunk_size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_json_records(file_path: str, chunk_size: int = RECORDS_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Потоково читает записи клиентов из JSON файла отчёта пачками по chunk_size.
+
+    Поддерживаются те же форматы, что и в parse_report_file: список клиентов
+    на верхнем уровне или объект, в котором клиенты лежат в первом ключе со списком.
+    Пиковое потребление памяти не зависит от размера файла.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f)
+        first = stream.peek()
+        if first == '[':
+            logger.info("Данные в формате списка")
+        elif first == '{':
+            logger.info("Данные в формате словаря, поиск списка клиентов")
+            if not stream.seek_first_list_in_object():
+                logger.warning("Список клиентов в файле не найден")
+                return
+        else:
+            logger.warning(f"Неизвестный формат данных, первый символ: {first!r}")
+            return
+        yield from _chunked(stream.iter_array(), chunk_size)
+
+
+def iter_records(data: Any, chunk_size: int = RECORDS_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    То же, что iter_json_records, но для уже загруженных в память данных
+    """
+    if isinstance(data, dict):
+        data = next((value for value in data.values() if isinstance(value, list)), [])
+    elif not isinstance(data, list):
+        logger.warning(f"Неизвестный формат данных: {type(data)}")
+        return
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def _table_records(header: Sequence[Any], rows: Iterable[Sequence[Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Строки таблицы в записи того же вида, что и в JSON отчёте:
+    колонки consumption.<месяц> собираются в словарь consumption,
+    пустые ячейки становятся None
+    """
+    names = [str(name).strip() if name is not None else '' for name in header]
+    months = {
+        i: name[len(TABLE_CONSUMPTION_PREFIX):]
+        for i, name in enumerate(names)
+        if name.startswith(TABLE_CONSUMPTION_PREFIX)
+    }
+    fields = [(i, name) for i, name in enumerate(names) if name and i not in months]
+    for row in rows:
+        if not row or all(value is None or value == '' for value in row):
+            continue
+        size = len(row)
+        record = {name: (row[i] if i < size and row[i] != '' else None) for i, name in fields}
+        if months:
+            record['consumption'] = {
+                month: row[i] for i, month in months.items()
+                if i < size and row[i] is not None and row[i] != ''
+            }
+        # В CSV все значения — строки, а id клиента должен быть числом, как в JSON
+        account_id = record.get('accountId')
+        if isinstance(account_id, str) and account_id.strip().isdigit():
+            record['accountId'] = int(account_id)
+        elif isinstance(account_id, float) and account_id.is_integer():
+            record['accountId'] = int(account_id)
+        yield record
+
+
+def iter_csv_records(file_path: str, chunk_size: int = RECORDS_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Потоково читает записи клиентов из CSV пачками по chunk_size.
+    Разделитель (',', ';' или табуляция) определяется по началу файла,
+    первая строка — заголовок с теми же именами полей, что и в JSON
+    """
+    # utf-8-sig убирает BOM, который добавляет Excel
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(CSV_SNIFF_SIZE)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        logger.info(f"Данные в формате CSV, разделитель: {dialect.delimiter!r}")
+        reader = csv.reader(f, dialect)
+        header = next(reader, None)
+        if not header:
+            logger.warning("CSV файл пуст")
+            return
+        yield from _chunked(_table_records(header, reader), chunk_size)
+
+
+def iter_xlsx_records(file_path: str, chunk_size: int = RECORDS_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Потоково читает записи клиентов с первого листа XLSX пачками по chunk_size.
+    Книга открывается в режиме read_only: строки читаются по одной
+    и лист целиком в память не загружается
+    """
+    if openpyxl is None:
+        raise RuntimeError("Для чтения XLSX необходим пакет openpyxl")
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        logger.info(f"Данные в формате XLSX, лист: {sheet.title}")
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            logger.warning("Лист XLSX пуст")
+            return
+        yield from _chunked(_table_records(header, rows), chunk_size)
+    finally:
+        workbook.close()
+
+
+def report_extension(file_path: str) -> str:
+    """Расширение файла отчёта в нижнем регистре, без точки"""
+    return os.path.splitext(file_path)[1].lstrip('.').lower()
+
+
+def iter_report_records(file_path: str, chunk_size: int = RECORDS_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Потоковое чтение записей клиентов из файла отчёта: формат выбирается
+    по расширению, файлы с другими расширениями, как и раньше, читаются как JSON
+    """
+    extension = report_extension(file_path)
+    if extension == 'csv':
+        return iter_csv_records(file_path, chunk_size)
+    if extension == 'xlsx':
+        return iter_xlsx_records(file_path, chunk_size)
+    if extension != 'json':
+        logger.warning(f"Неизвестное расширение файла {extension!r}, читаем как JSON")
+    return iter_json_records(file_path, chunk_size)
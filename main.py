@@ -12,6 +12,8 @@ from routers.client import router as client_router
 from routers.report import router as report_router
 from routers.verify import router as verify_router
 
+from data_cleaning.report_check import resume_report_jobs, report_pool
+
 from utils.config import API_HOST, API_PORT, API_VERSION, API_RELOAD
 
 def get_git_commit_id() -> str:
@@ -22,7 +24,15 @@ def get_git_commit_id() -> str:
     except subprocess.CalledProcessError:
         return "unknown"
     
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Продолжаем проверки отчетов, прерванные перезапуском API
+    await resume_report_jobs()
+    yield
+    report_pool.shutdown()
+
 app = FastAPI(
+    lifespan=lifespan,
     root_path=f"/{API_VERSION}",
     version="#"+get_git_commit_id()[:7],
     title="True Kilowatt API"
@@ -1,34 +1,29 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from fastapi.datastructures import UploadFile as FastAPIUploadFile
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from pydantic import BaseModel
-import uuid
-from datetime import datetime
 import os
 from pathlib import Path
 import json
-from data_cleaning.parse_report import process_report
-import asyncio
+from data_cleaning.report_check import ACTIVE_JOB_STATUSES, job_metrics, job_progress, report_stats, schedule_report_check
+from data_cleaning.report_reader import SUPPORTED_EXTENSIONS
 import sys
 import subprocess
 import logging
 
 from utils.auth import get_current_user
-from utils.models import Client, Report, File, User
+from utils.models import Client, Report, File, User, ReportJob
 from utils.database import get_async_session
+from utils.config import UPLOAD_DIR, BASE_URL, PROCESS_TIMEOUT
+from utils.storage import store_upload_blob
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Конфигурация путей
-UPLOAD_DIR = "/var/www/kilowatt/public/file"
-BASE_URL = "https://true.kilowattt.ru/file"
-PROCESS_TIMEOUT = 300  # 5 минут таймаут по умолчанию
-
 router = APIRouter(prefix="/report", tags=["Отчеты"])
 
 class ClientResponse(BaseModel):
@@ -80,6 +75,8 @@ class FileResponse(BaseModel):
     is_parsed: bool
     report_id: int
     s3_url: str
+    sha256: Optional[str] = None
+    size: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -106,30 +103,28 @@ async def upload_file(
     #current_user: User = Depends(get_current_user)
 ):
     """
-    Загрузить файл в отчет
+    Загрузить файл в отчет (JSON, CSV или XLSX)
     """
     # Проверяем существование отчета
     report = await db.get(Report, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Отчет не найден")
     
+    file_extension = os.path.splitext(file.filename or '')[1].lstrip('.').lower()
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неподдерживаемый формат файла, допустимы: {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
+    
     try:
         # Создаем директорию, если её нет
         Path(UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
         
-        # Генерируем уникальное имя файла
-        file_extension = file.filename.split('.')[-1]
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_id = str(uuid.uuid4())[:8]
-        filename = f"{timestamp}_{unique_id}.{file_extension}"
-        
-        # Полный путь к файлу
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        # Сохраняем файл
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Файл хранится под именем, равным хэшу содержимого: одинаковые
+        # выгрузки в разных отчетах ссылаются на один и тот же файл на диске
+        filename, sha256, size = await store_upload_blob(file, UPLOAD_DIR, file_extension)
+        logger.info(f"Файл {file.filename} сохранен как {filename}, размер: {size} байт")
         
         # Формируем URL для доступа к файлу
         file_url = f"{BASE_URL}/{filename}"
@@ -137,7 +132,9 @@ async def upload_file(
         # Создаем запись о файле в базе данных
         db_file = File(
             report_id=report_id,
-            s3_url=file_url  # Используем то же поле, просто меняем URL
+            s3_url=file_url,  # Используем то же поле, просто меняем URL
+            sha256=sha256,
+            size=size
         )
         db.add(db_file)
         await db.commit()
@@ -148,37 +145,27 @@ async def upload_file(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при загрузке файла: {str(e)}")
 
-async def update_or_create_client(client: Client, db: AsyncSession) -> Client:
-    """
-    Обновляет существующего клиента или создает нового
-    """
-    # Проверяем существование клиента
-    query = select(Client).where(Client.id == client.id)
+async def get_active_job(db: Session, report_id: int) -> Optional[ReportJob]:
+    """Незавершённая задача проверки отчета, если она есть"""
+    query = select(ReportJob).where(
+        ReportJob.report_id == report_id,
+        ReportJob.status.in_(ACTIVE_JOB_STATUSES)
+    ).order_by(ReportJob.id.desc())
     result = await db.execute(query)
-    existing_client = result.scalar_one_or_none()
-    
-    if existing_client:
-        # Обновляем существующего клиента
-        for key, value in client.__dict__.items():
-            if not key.startswith('_'):
-                setattr(existing_client, key, value)
-        return existing_client
-    else:
-        # Создаем нового клиента
-        return client
+    return result.scalars().first()
 
 @router.post("/{report_id}/check")
 async def start_check(
     report_id: int,
-    #background_tasks: BackgroundTasks,
     db: Session = Depends(get_async_session),
     timeout: Optional[int] = PROCESS_TIMEOUT,
     #current_user: User = Depends(get_current_user)
 ):
     """
-    Запустить проверку отчета и парсеры в фоновом режиме
+    Запустить проверку отчета и парсеры в фоновом режиме.
+    Сразу возвращает id задачи, прогресс доступен через /report/{report_id}/status
     """
-    logger.info(f"Запуск обработки отчета {report_id} с таймаутом {timeout} секунд")
+    logger.info(f"Постановка в очередь обработки отчета {report_id} с таймаутом {timeout} секунд")
     
     # Проверяем существование отчета
     report = await db.get(Report, report_id)
@@ -192,163 +179,102 @@ async def start_check(
     
     if not files:
         raise HTTPException(status_code=404, detail="Файлы отчета не найдены")
-
-    async def process_files():
-        try:
-            logger.info(f"Начало обработки файлов для отчета {report_id}")
-            total_clients = 0
-            total_consumption = 0
-            commercial_clients = 0
-            residential_clients = 0
-            total_area = 0
-            processed_files = 0
-            failed_files = 0
-            
-            # Создаем список задач для асинхронной обработки
-            tasks = []
-            
-            # Обрабатываем каждый файл
-            for file in files:
-                if not file.is_parsed:
-                    # Получаем путь к файлу из URL
-                    filename = file.s3_url.split('/')[-1]
-                    file_path = os.path.join(UPLOAD_DIR, filename)
-                    logger.info(f"Подготовка к обработке файла: {filename}")
-                    
-                    # Проверяем существование файла
-                    if not os.path.exists(file_path):
-                        logger.error(f"Файл не найден: {file_path}")
-                        failed_files += 1
-                        continue
-                    
-                    # Создаем задачу для обработки файла
-                    async def process_single_file(file_path, file_id):
-                        try:
-                            logger.info(f"Начало обработки файла: {file_path}")
-                            
-                            # Читаем содержимое файла
-                            logger.info(f"Чтение файла: {file_path}")
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                file_content = f.read()
-                            logger.info(f"Файл прочитан, размер: {len(file_content)} байт")
-                            
-                            # Запускаем process_report в отдельном потоке с таймаутом
-                            logger.info(f"Запуск process_report для файла: {file_path}")
-                            try:
-                                # Используем asyncio.wait_for для установки таймаута
-                                clients = await asyncio.wait_for(
-                                    asyncio.get_event_loop().run_in_executor(
-                                        None, 
-                                        process_report, 
-                                        file_path, 
-                                        report_id
-                                    ),
-                                    timeout=timeout
-                                )
-                                logger.info(f"Файл обработан, получено клиентов: {len(clients)}")
-                            except asyncio.TimeoutError:
-                                logger.error(f"Таймаут при обработке файла: {file_path} (таймаут: {timeout} сек)")
-                                raise Exception(f"Превышено время обработки файла ({timeout} сек)")
-                            
-                            # Обновляем статистику
-                            nonlocal total_clients, total_consumption, commercial_clients, residential_clients, total_area, processed_files
-                            total_clients += len(clients)
-                            processed_files += 1
-                            
-                            # Собираем статистику
-                            logger.info(f"Начало сбора статистики для файла: {file_path}")
-                            for client in clients:
-                                if hasattr(client, 'is_commercial'):
-                                    if client.is_commercial:
-                                        commercial_clients += 1
-                                    else:
-                                        residential_clients += 1
-                                
-                                if hasattr(client, 'home_area'):
-                                    total_area += client.home_area or 0
-                                
-                                if hasattr(client, 'consumption'):
-                                    total_consumption += client.consumption or 0
-                            logger.info(f"Статистика собрана для файла: {file_path}")
-                            
-                            logger.info(f"Сохранение клиентов в базу данных для файла: {file_path}")
-                            # Сохраняем клиентов в базу данных
-                            for client in clients:
-                                updated_client = await update_or_create_client(client, db)
-                                db.add(updated_client)
-                            
-                            # Отмечаем файл как обработанный
-                            file.is_parsed = True
-                            logger.info(f"Файл успешно обработан: {file_path}")
-                            return True
-                        except Exception as e:
-                            logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}", exc_info=True)
-                            nonlocal failed_files
-                            failed_files += 1
-                            return False
-                    
-                    tasks.append(process_single_file(file_path, file.id))
-            
-            # Запускаем все задачи параллельно
-            if tasks:
-                logger.info(f"Запуск параллельной обработки {len(tasks)} файлов")
-                await asyncio.gather(*tasks)
-                logger.info("Параллельная обработка завершена")
-            
-            # Обновляем статус отчета
-            logger.info("Обновление статуса отчета")
-            report = await db.get(Report, report_id)
-            if report:
-                report.is_ready = True
-                report.all_count = total_clients
-                await db.commit()
-                logger.info("Статус отчета обновлен")
-            
-            logger.info(f"Обработка завершена. Статистика: обработано файлов: {processed_files}, ошибок: {failed_files}")
-            return {
-                "status": "success",
-                "statistics": {
-                    "total_clients": total_clients,
-                    "total_consumption": total_consumption,
-                    "commercial_clients": commercial_clients,
-                    "residential_clients": residential_clients,
-                    "total_area": total_area,
-                    "processed_files": processed_files,
-                    "failed_files": failed_files
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"Критическая ошибка при обработке отчета {report_id}: {str(e)}")
-            # Обновляем статус отчета в случае ошибки
-            report = await db.get(Report, report_id)
-            if report:
-                report.is_ready = False
-                await db.commit()
-            return {
-                "status": "error",
-                "error": str(e),
-                "statistics": {
-                    "total_clients": total_clients,
-                    "total_consumption": total_consumption,
-                    "commercial_clients": commercial_clients,
-                    "residential_clients": residential_clients,
-                    "total_area": total_area,
-                    "processed_files": processed_files,
-                    "failed_files": failed_files
-                }
-            }
-
-    result = await process_files()
     
-    # Сразу возвращаем ответ
+    # Не запускаем вторую проверку того же отчета, пока идёт первая
+    job = await get_active_job(db, report_id)
+    if job:
+        return {
+            "message": "Проверка уже выполняется",
+            "report_id": report_id,
+            "job_id": job.id,
+            "status": job.status
+        }
+    
+    job = ReportJob(report_id=report_id, status="queued", stage="queued", timeout=timeout)
+    db.add(job)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Параллельный запрос успел поставить проверку этого отчета (ux_report_jobs_active)
+        await db.rollback()
+        job = await get_active_job(db, report_id)
+        if not job:
+            raise HTTPException(status_code=409, detail="Проверка отчета только что завершилась, повторите запрос")
+        return {
+            "message": "Проверка уже выполняется",
+            "report_id": report_id,
+            "job_id": job.id,
+            "status": job.status
+        }
+    await db.refresh(job)
+    
+    # Тот же запуск, что и у задач, возобновляемых при старте API
+    schedule_report_check(job.id)
+    
     return {
-        "message": "Проверка завершена",
+        "message": "Проверка поставлена в очередь",
         "report_id": report_id,
-        "status": result["status"],
-        "statistics": result["statistics"]
+        "job_id": job.id,
+        "status": job.status
     }
 
+@router.get("/{report_id}/status")
+async def get_check_status(
+    report_id: int,
+    job_id: Optional[int] = None,
+    db: Session = Depends(get_async_session),
+    #current_user: User = Depends(get_current_user)
+):
+    """
+    Получить статус проверки отчета: этап, количество обработанных клиентов,
+    скорость и оценку оставшегося времени. Без job_id возвращается последняя задача
+    """
+    query = select(ReportJob).where(ReportJob.report_id == report_id)
+    if job_id is not None:
+        query = query.where(ReportJob.id == job_id)
+    result = await db.execute(query.order_by(ReportJob.id.desc()))
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача проверки не найдена")
+    return job_progress(job)
+
+@router.get("/{report_id}/metrics")
+async def get_check_metrics(
+    report_id: int,
+    job_id: Optional[int] = None,
+    db: Session = Depends(get_async_session),
+    #current_user: User = Depends(get_current_user)
+):
+    """
+    Получить замеры этапов проверки отчета (чтение, парсинг, заполнение
+    пропусков, запись в БД): время, процессорное время, количество строк
+    и пиковую память — суммарно и по каждому файлу. Без job_id возвращается последняя задача
+    """
+    query = select(ReportJob).where(ReportJob.report_id == report_id)
+    if job_id is not None:
+        query = query.where(ReportJob.id == job_id)
+    result = await db.execute(query.order_by(ReportJob.id.desc()))
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача проверки не найдена")
+    return job_metrics(job)
+
+@router.get("/{report_id}/stats")
+async def get_report_stats(
+    report_id: int,
+    db: Session = Depends(get_async_session),
+    #current_user: User = Depends(get_current_user)
+):
+    """
+    Получить статистику отчета: количество клиентов, коммерческих и бытовых,
+    суммарные площадь и потребление. Значения считаются при проверке отчета
+    и хранятся в отчете, клиенты при запросе не пересчитываются
+    """
+    report = await db.get(Report, report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Отчет не найден")
+    return report_stats(report)
+
 @router.get("/list", response_model=List[ReportResponse])
 async def get_all_reports(
     db: Session = Depends(get_async_session),
@@ -0,0 +1,14 @@
+import pandas as pd
+
+from data_cleaning.address import parse_addresses
+
+
+def test_corpus_and_structure_are_different_buildings():
+    keys = parse_addresses(pd.Series([
+        "г Москва, ул Ленина, д 5 стр 2, кв 3",
+        "г. Москва, улица Ленина, дом 5, строение 2",
+        "г Москва, ул Ленина, д 5 к 2",
+        "г Москва, ул Ленина, д 5, корп. 2, кв 7",
+    ]))["building_key"].tolist()
+    assert keys[0] == keys[1] == "г москва, ул ленина, д 5 стр 2"
+    assert keys[2] == keys[3] == "г москва, ул ленина, д 5 к 2"
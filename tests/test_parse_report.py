@@ -0,0 +1,93 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from data_cleaning.parse_report import parse_client_data, parse_clients_batch
+
+AREAS = ["12,345", 12.345, 2.675, "0,125", "1,005", 1.005, True, "nan", "inf", "abc", 0, None]
+COUNTS = ["3,7", 2.9, "2", True, "nan", "abc", 0, None]
+CONSUMPTION = [
+    {"1": 100, "2": 200.5, "3": 300},
+    {"1": "nan"},
+    {"1": "nan", "2": 5000, "3": 7000},
+    {"1": 5000, "2": "nan", "3": 1},
+    {"1": "inf", "2": 10},
+    {"1": "-inf", "2": "inf"},
+    {"1": True, "2": False, "3": 4000},
+    {"1": None, "2": 3500},
+    {"1": None},
+    {"2": 4000, "1": "nan"},
+    {},
+    None,
+]
+
+
+def make_clients():
+    clients = []
+    for i, (area, rooms, people, consumption) in enumerate(
+        itertools.product(AREAS, COUNTS, COUNTS[::-1], CONSUMPTION)
+    ):
+        if i % 7:
+            continue
+        clients.append({
+            "accountId": i,
+            "address": f"г Москва, ул Ленина, д {i}",
+            "buildingType": "Частный",
+            "roomsCount": rooms,
+            "residentsCount": people,
+            "totalArea": area,
+            "consumption": consumption,
+        })
+    return clients
+
+
+def legacy_frame(clients):
+    return pd.DataFrame([parse_client_data(client) for client in clients])
+
+
+def as_values(frame):
+    # None и NaN в колонках означают одно и то же — пропуск
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None)
+
+
+def assert_same_as_legacy(clients, legacy_clients=None):
+    expected = legacy_frame(legacy_clients or clients)
+    actual = parse_clients_batch(clients)
+    assert set(expected.columns) <= set(actual.columns)
+    pd.testing.assert_frame_equal(
+        as_values(actual[list(expected.columns)]),
+        as_values(expected),
+        check_exact=True,
+    )
+
+
+def test_batch_matches_per_client_parse():
+    assert_same_as_legacy(make_clients())
+
+
+@pytest.mark.parametrize("area, expected", [("12,345", 12.35), (2.675, round(2.675, 2)), ("1,005", round(1.005, 2))])
+def test_home_area_rounds_like_builtin_round(area, expected):
+    frame = parse_clients_batch([{"accountId": 1, "totalArea": area, "consumption": {"1": 100}}])
+    assert frame["home_area"].tolist() == [expected]
+
+
+def test_nan_string_consumption_is_not_commercial():
+    frame = parse_clients_batch([{"accountId": 1, "consumption": {"1": "nan"}}])
+    assert frame["is_commercial"].tolist() == [False]
+
+
+def test_comma_decimal_consumption_matches_dot_decimal():
+    # parse_client_data не разбирает показания с запятой, поэтому
+    # сравниваем с разбором тех же чисел, записанных через точку
+    clients = [
+        {"accountId": i, "totalArea": "45,5", "residentsCount": 2,
+         "consumption": {"1": "1234,56", "2": 3100, "3": "2999,99"}}
+        for i in range(3)
+    ]
+    dotted = [
+        {**client, "consumption": {month: str(value).replace(",", ".") for month, value in client["consumption"].items()}}
+        for client in clients
+    ]
+    assert_same_as_legacy(clients, dotted)
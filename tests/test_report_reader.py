@@ -0,0 +1,33 @@
+import io
+import json
+
+import pytest
+
+from data_cleaning.report_reader import _JsonStream
+
+VALUES = [
+    1.5e10, -2, 0.25, 3e-7, 12345678901234567890, 1E+2, -0.0, True, None, "1.5e10",
+    {"accountId": 1, "totalArea": 45.5, "consumption": {"1": 1.5e3, "2": "2,5"}},
+    [1, 2.0, [3e3]], 7, 1.25,
+]
+
+
+@pytest.mark.parametrize("buffer_size", range(1, 17))
+def test_array_decodes_with_any_buffer_size(buffer_size):
+    text = json.dumps(VALUES)
+    stream = _JsonStream(io.StringIO(text), buffer_size=buffer_size)
+    assert list(stream.iter_array()) == VALUES
+
+
+@pytest.mark.parametrize("buffer_size", range(1, 17))
+def test_compact_array_in_object_decodes_with_any_buffer_size(buffer_size):
+    text = json.dumps({"total": 1.5e10, "clients": VALUES}, separators=(",", ":"))
+    stream = _JsonStream(io.StringIO(text), buffer_size=buffer_size)
+    assert stream.seek_first_list_in_object()
+    assert list(stream.iter_array()) == VALUES
+
+
+def test_truncated_number_at_end_of_file_is_an_error():
+    stream = _JsonStream(io.StringIO("[1.5e"), buffer_size=3)
+    with pytest.raises(ValueError):
+        list(stream.iter_array())
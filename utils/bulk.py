@@ -0,0 +1,299 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert as sa_insert, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from utils.config import CLIENTS_UPSERT_BATCH_SIZE
+from utils.models import Client, ClientConsumption, ImputationSource, ImputationStat
+
+# Ограничение протокола PostgreSQL на число параметров в одном запросе
+POSTGRES_MAX_PARAMS = 32767
+
+
+def _batches(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _batch_size_for(columns: List[str], batch_size: int) -> int:
+    """Уменьшает размер пачки так, чтобы запрос уложился в лимит параметров"""
+    return max(1, min(batch_size, POSTGRES_MAX_PARAMS // max(len(columns), 1)))
+
+
+async def bulk_upsert_clients(
+    db: AsyncSession,
+    records: List[Dict[str, Any]],
+    batch_size: int = CLIENTS_UPSERT_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Пакетно записывает клиентов через INSERT ... ON CONFLICT (id) DO UPDATE.
+
+    Вместо SELECT + setattr на каждого клиента выполняется один запрос на
+    пачку из batch_size записей. Обновляются только переданные колонки,
+    остальные поля существующих клиентов (например, результаты проверки
+    на фрод) не трогаются. Коммит остаётся за вызывающим кодом.
+
+    Returns:
+        Словарь со счётчиками inserted и updated
+    """
+    counts = {"inserted": 0, "updated": 0}
+    if not records:
+        return counts
+
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    columns_without_id = [column for column in columns if column != 'id']
+
+    # Повторы одного id внутри запроса ON CONFLICT не допускает — побеждает последняя запись,
+    # как и при прежней построчной записи
+    by_id = {}
+    without_id = []
+    for record in records:
+        if record.get('id') is None:
+            without_id.append({column: record.get(column) for column in columns_without_id})
+        else:
+            by_id[record['id']] = {column: record.get(column) for column in columns}
+
+    # Строки блокируются в порядке id: параллельные транзакции с пересекающимися
+    # клиентами ждут друг друга, а не попадают во взаимную блокировку
+    rows = [by_id[client_id] for client_id in sorted(by_id)]
+    # Запрос один на все пачки и передаётся со списком параметров: SQLAlchemy
+    # сам разворачивает его в многострочный VALUES (insertmanyvalues) и не
+    # компилирует заново под каждую пачку, как при insert().values(batch)
+    stmt = insert(Client.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Client.id],
+        set_={column: stmt.excluded[column] for column in columns_without_id},
+    ).returning(literal_column("(xmax = 0)").label("inserted"))
+    for batch in _batches(rows, batch_size):
+        result = await db.execute(stmt, batch)
+        inserted = sum(1 for (is_new,) in result if is_new)
+        counts["inserted"] += inserted
+        counts["updated"] += len(batch) - inserted
+
+    # Клиенты без accountId получают id из последовательности
+    for batch in _batches(without_id, batch_size):
+        await db.execute(sa_insert(Client.__table__), batch)
+        counts["inserted"] += len(batch)
+
+    return counts
+
+
+async def bulk_replace_consumption(
+    db: AsyncSession,
+    client_ids: List[int],
+    report_ids: List[int],
+    months: List[str],
+    values: np.ndarray,
+    batch_size: int = CLIENTS_UPSERT_BATCH_SIZE,
+) -> int:
+    """
+    Заменяет помесячное потребление клиентов в clients_consumption.
+
+    values — матрица клиенты × месяцы (NaN — нет показания), её строки
+    соответствуют client_ids и report_ids. Хранится только последний ряд
+    клиента, как и сами клиенты в clients: прежний ряд удаляется целиком
+    (вместе с месяцами, которых нет в новом), новый вставляется пачками
+    INSERT ... ON CONFLICT DO UPDATE, а report_id отмечает отчет, из
+    которого он взят. Коммит остаётся за вызывающим кодом.
+
+    Returns:
+        Сколько значений записано
+    """
+    columns = ['client_id', 'report_id', 'month', 'value']
+    month_names = np.array(months, dtype=object)
+    stmt = insert(ClientConsumption.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ClientConsumption.client_id, ClientConsumption.month],
+        set_={"report_id": stmt.excluded.report_id, "value": stmt.excluded.value},
+    )
+    written = 0
+    for start in range(0, len(client_ids), batch_size):
+        ids = np.asarray(client_ids[start:start + batch_size])
+        block = values[start:start + batch_size]
+        await db.execute(delete(ClientConsumption).where(ClientConsumption.client_id.in_(ids.tolist())))
+
+        rows, cols = np.nonzero(~np.isnan(block))
+        batch = [
+            dict(zip(columns, row))
+            for row in zip(
+                ids[rows].tolist(),
+                np.asarray(report_ids[start:start + batch_size])[rows].tolist(),
+                month_names[cols].tolist(),
+                block[rows, cols].tolist(),
+            )
+        ]
+        if batch:
+            await db.execute(stmt, batch)
+        written += len(batch)
+    return written
+
+
+async def load_imputation_stats(db: AsyncSession) -> pd.DataFrame:
+    """
+    Накопленная статистика для заполнения пропусков одним запросом
+    (колонки home_type, region, field, value_sum, value_count)
+    """
+    columns = ['home_type', 'region', 'field', 'value_sum', 'value_count']
+    result = await db.execute(select(*(getattr(ImputationStat, column) for column in columns)))
+    return pd.DataFrame(result.all(), columns=columns)
+
+
+async def add_imputation_stats(
+    db: AsyncSession,
+    source: str,
+    delta: List[Dict[str, Any]],
+    batch_size: int = CLIENTS_UPSERT_BATCH_SIZE,
+) -> bool:
+    """
+    Прибавляет вклад файла к статистике заполнения через
+    INSERT ... ON CONFLICT DO UPDATE SET value_sum = value_sum + excluded.value_sum.
+    Каждый источник (SHA-256 файла) учитывается один раз: повторная проверка
+    того же файла статистику не меняет. Коммит остаётся за вызывающим кодом.
+
+    Returns:
+        True, если вклад добавлен, False — если источник уже был учтён
+    """
+    result = await db.execute(
+        insert(ImputationSource)
+        .values(source=source)
+        .on_conflict_do_nothing()
+        .returning(ImputationSource.source)
+    )
+    if result.first() is None:
+        return False
+
+    columns = ['home_type', 'region', 'field', 'value_sum', 'value_count']
+    rows = [{column: row[column] for column in columns} for row in delta]
+    for batch in _batches(rows, _batch_size_for(columns, batch_size)):
+        stmt = insert(ImputationStat).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ImputationStat.home_type, ImputationStat.region, ImputationStat.field],
+            set_={
+                "value_sum": ImputationStat.value_sum + stmt.excluded.value_sum,
+                "value_count": ImputationStat.value_count + stmt.excluded.value_count,
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+    return True
+
+
+def _month_sort_key(month: str) -> Tuple[int, Any]:
+    """Числовые месяцы сортируются как числа, остальные — как строки после них"""
+    return (0, int(month)) if month.isdigit() else (1, month)
+
+
+async def load_consumption_series(
+    db: AsyncSession,
+    report_id: Optional[int] = None,
+    client_ids: Optional[Iterable[int]] = None,
+) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    Загружает помесячное потребление многих клиентов одним запросом.
+
+    Args:
+        report_id: Только ряды из этого отчета
+        client_ids: Только эти клиенты
+
+    Returns:
+        Массив id клиентов (по возрастанию), список месяцев и матрица
+        клиенты × месяцы с NaN там, где показания нет
+    """
+    query = select(ClientConsumption.client_id, ClientConsumption.month, ClientConsumption.value)
+    if report_id is not None:
+        query = query.where(ClientConsumption.report_id == report_id)
+    if client_ids is not None:
+        query = query.where(ClientConsumption.client_id.in_(list(client_ids)))
+    result = await db.execute(query)
+    rows = result.all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), [], np.empty((0, 0))
+
+    client_column, month_column, value_column = zip(*rows)
+    ids, row_index = np.unique(np.array(client_column, dtype=np.int64), return_inverse=True)
+    months = sorted(set(month_column), key=_month_sort_key)
+    month_position = {month: j for j, month in enumerate(months)}
+    col_index = np.fromiter(map(month_position.__getitem__, month_column), dtype=np.intp, count=len(rows))
+
+    values = np.full((len(ids), len(months)), np.nan)
+    values[row_index, col_index] = np.array(value_column, dtype=float)
+    return ids, months, values
+
+
+async def upsert_changed_clients(
+    db: AsyncSession,
+    records: List[Dict[str, Any]],
+    batch_size: int = CLIENTS_UPSERT_BATCH_SIZE,
+    consumption: Optional[Dict[str, Any]] = None,
+) -> Dict[str, int]:
+    """
+    Записывает только новых и изменившихся клиентов.
+
+    Для каждой пачки одним запросом читаются сохранённые content_hash,
+    записи с совпавшим хэшем не перезаписываются (нет лишнего WAL и
+    обновления индексов) — им только переносится report_id, если клиент
+    пришёл в новом отчёте. Остальные пишутся через bulk_upsert_clients.
+
+    consumption — помесячный ряд из process_report_records ({"months", "values"},
+    строки values соответствуют records). Для новых и изменившихся клиентов
+    он записывается через bulk_replace_consumption; у клиентов без id ряд
+    не сохраняется, так как их id известен только после вставки.
+
+    Returns:
+        Словарь со счётчиками unchanged, inserted, updated и consumption_values
+    """
+    counts = {"unchanged": 0, "inserted": 0, "updated": 0, "consumption_values": 0}
+    with_id = [record for record in records if record.get('id') is not None]
+    changed = [record for record in records if record.get('id') is None]
+
+    for batch in _batches(with_id, batch_size):
+        result = await db.execute(
+            select(Client.id, Client.content_hash).where(Client.id.in_([record['id'] for record in batch]))
+        )
+        stored_hashes = dict(result.all())
+
+        restamp: Dict[int, List[int]] = {}
+        for record in batch:
+            if record['id'] in stored_hashes and stored_hashes[record['id']] == record.get('content_hash'):
+                restamp.setdefault(record.get('report_id'), []).append(record['id'])
+            else:
+                changed.append(record)
+
+        for report_id, ids in restamp.items():
+            counts["unchanged"] += len(ids)
+            await db.execute(
+                update(Client)
+                .where(Client.id.in_(ids), Client.report_id.is_distinct_from(report_id))
+                .values(report_id=report_id)
+            )
+            await db.execute(
+                update(ClientConsumption)
+                .where(ClientConsumption.client_id.in_(ids), ClientConsumption.report_id.is_distinct_from(report_id))
+                .values(report_id=report_id)
+            )
+
+    written = await bulk_upsert_clients(db, changed, batch_size)
+    counts["inserted"] += written["inserted"]
+    counts["updated"] += written["updated"]
+
+    if consumption is not None:
+        # Позиция последней записи каждого id — как и в bulk_upsert_clients, побеждает последняя
+        changed_ids = {record['id'] for record in changed if record.get('id') is not None}
+        positions = {
+            record['id']: position
+            for position, record in enumerate(records)
+            if record.get('id') in changed_ids
+        }
+        rows = list(positions.values())
+        counts["consumption_values"] = await bulk_replace_consumption(
+            db,
+            list(positions.keys()),
+            [records[row].get('report_id') for row in rows],
+            consumption["months"],
+            consumption["values"][rows],
+            batch_size,
+        )
+    return counts
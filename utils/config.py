@@ -8,6 +8,8 @@ DB_PORT=os.environ.get("DB_PORT")
 DB_NAME=os.environ.get("DB_NAME")
 DB_USER=os.environ.get("DB_USER")
 DB_PASSWORD=os.environ.get("DB_PASSWORD")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))  # постоянных соединений в пуле
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))  # дополнительных соединений сверх пула
 
 # API settings
 API_HOST = os.environ.get("API_HOST", "0.0.0.0")
@@ -15,6 +17,28 @@ API_PORT = os.environ.get("API_PORT", "8000")
 API_VERSION = os.environ.get("API_VERSION", "v1")   
 API_RELOAD =    os.environ.get("API_RELOAD", "True").lower() == "true"
 
+# Report processing settings
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "/var/www/kilowatt/public/file")
+BASE_URL = os.environ.get("BASE_URL", "https://true.kilowattt.ru/file")
+PROCESS_TIMEOUT = int(os.environ.get("PROCESS_TIMEOUT", "300"))  # 5 минут таймаут по умолчанию
+CLIENTS_UPSERT_BATCH_SIZE = int(os.environ.get("CLIENTS_UPSERT_BATCH_SIZE", "1000"))
+CLIENTS_COMMIT_BATCH_SIZE = int(os.environ.get("CLIENTS_COMMIT_BATCH_SIZE", "20000"))  # клиентов на одну транзакцию при записи файла
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", "2"))  # процессов для парсинга отчётов
+REPORT_WORKER_MAX_TASKS = int(os.environ.get("REPORT_WORKER_MAX_TASKS", "20"))  # задач до перезапуска процесса
+REPORT_FILE_CONCURRENCY = int(os.environ.get("REPORT_FILE_CONCURRENCY", "4"))  # файлов отчета, обрабатываемых одновременно
+FROD_SWEEP_INTERVAL = int(os.environ.get("FROD_SWEEP_INTERVAL", "300"))  # резервная проверка очереди фрода без сигнала (сек)
+FROD_CLAIM_BATCH_SIZE = int(os.environ.get("FROD_CLAIM_BATCH_SIZE", "50"))  # клиентов, забираемых воркером за раз
+FROD_LEASE_SECONDS = int(os.environ.get("FROD_LEASE_SECONDS", "300"))  # срок закрепления клиентов за воркером без продления
+FROD_CLIENT_TIMEOUT = int(os.environ.get("FROD_CLIENT_TIMEOUT", "90"))  # таймаут внешней проверки одного клиента (сек)
+LOOKUP_CACHE_TTL = int(os.environ.get("LOOKUP_CACHE_TTL", str(7 * 24 * 3600)))  # срок хранения найденной внешней проверкой ссылки (сек)
+LOOKUP_CACHE_NEGATIVE_TTL = int(os.environ.get("LOOKUP_CACHE_NEGATIVE_TTL", str(24 * 3600)))  # срок хранения пустого результата проверки (сек)
+SELENIUM_POOL_SIZE = int(os.environ.get("SELENIUM_POOL_SIZE", "2"))  # драйверов Chrome для проверок адресов
+SELENIUM_MAX_PAGES = int(os.environ.get("SELENIUM_MAX_PAGES", "200"))  # страниц до перезапуска драйвера
+SELENIUM_MAX_RSS_MB = float(os.environ.get("SELENIUM_MAX_RSS_MB", "1500"))  # память Chrome, после которой драйвер перезапускается
+SELENIUM_PAGE_TIMEOUT = int(os.environ.get("SELENIUM_PAGE_TIMEOUT", "30"))  # таймаут загрузки страницы (сек)
+SELENIUM_CHECKOUT_TIMEOUT = int(os.environ.get("SELENIUM_CHECKOUT_TIMEOUT", "120"))  # ожидание свободного драйвера (сек)
+LOG_CLIENT_SAMPLE_RATE = float(os.environ.get("LOG_CLIENT_SAMPLE_RATE", "0.01"))  # доля клиентов в DEBUG-логе
+
 # JWT settings
 JWT_SECRET = os.environ.get("JWT_SECRET")
 
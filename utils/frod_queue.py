@@ -0,0 +1,16 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Клиенты в этом состоянии ждут проверки на фрод (см. data_cleaning.check_frod)
+FROD_PENDING_STATE = "Оценивается"
+# Канал LISTEN/NOTIFY, по которому загрузка отчетов будит проверку на фрод
+FROD_CHECK_CHANNEL = "frod_check"
+
+
+async def notify_frod_check(db: AsyncSession, clients: int) -> None:
+    """
+    Сообщает проверке на фрод о новых клиентах в очереди. NOTIFY доставляется
+    только при коммите транзакции, поэтому проверка не увидит сигнал раньше
+    самих клиентов, а при откате сигнал не отправляется вовсе
+    """
+    await db.execute(select(func.pg_notify(FROD_CHECK_CHANNEL, str(clients))))
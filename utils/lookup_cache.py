@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from utils.config import LOOKUP_CACHE_NEGATIVE_TTL, LOOKUP_CACHE_TTL
+from utils.models import LookupCache
+
+# Источники внешних проверок адресов
+LOOKUP_SOURCES = ("2gis", "avito", "yandex")
+
+
+class LookupCacheStats:
+    """Попадания и промахи кэша внешних проверок по источникам"""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _source(self, source: str) -> Dict[str, int]:
+        return self._counts.setdefault(source, {"hits": 0, "misses": 0})
+
+    def hit(self, source: str) -> None:
+        self._source(source)["hits"] += 1
+
+    def miss(self, source: str) -> None:
+        self._source(source)["misses"] += 1
+
+    def hit_rate(self, source: str) -> Optional[float]:
+        counts = self._source(source)
+        total = counts["hits"] + counts["misses"]
+        return counts["hits"] / total if total else None
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            source: {**counts, "hit_rate": round(self.hit_rate(source) or 0.0, 3)}
+            for source, counts in self._counts.items()
+        }
+
+    def summary(self) -> str:
+        """Строка для лога: "2gis: 12/40 (30%)" по каждому источнику"""
+        return ", ".join(
+            f"{source}: {counts['hits']}/{counts['hits'] + counts['misses']} ({counts['hit_rate']:.0%})"
+            for source, counts in self.to_dict().items()
+        )
+
+
+async def get_cached_lookups(db: AsyncSession, source: str, keys: Iterable[str]) -> Dict[str, LookupCache]:
+    """
+    Действующие (не истёкшие) результаты проверок источника по ключам адресов
+    одним запросом. Запись с result_url = NULL — сохранённый пустой результат:
+    адрес уже проверялся и ничего не нашлось
+    """
+    keys = [key for key in set(keys) if key]
+    if not keys:
+        return {}
+    result = await db.execute(
+        select(LookupCache).where(
+            LookupCache.source == source,
+            LookupCache.key.in_(keys),
+            LookupCache.expires_at > func.now(),
+        )
+    )
+    return {entry.key: entry for entry in result.scalars().all()}
+
+
+async def get_cached_lookup(db: AsyncSession, source: str, key: Optional[str]) -> Optional[LookupCache]:
+    """Действующий результат проверки одного адреса или None, если его нужно проверить"""
+    return (await get_cached_lookups(db, source, [key] if key else [])).get(key)
+
+
+async def store_lookup(
+    db: AsyncSession,
+    source: str,
+    key: Optional[str],
+    result_url: Optional[str],
+    evidence: Optional[str] = None,
+) -> None:
+    """
+    Сохраняет результат проверки адреса (INSERT ... ON CONFLICT DO UPDATE).
+    Найденная ссылка хранится LOOKUP_CACHE_TTL секунд, пустой результат —
+    LOOKUP_CACHE_NEGATIVE_TTL. Сохранять нужно только завершившиеся проверки:
+    ошибка или таймаут — не пустой результат. Коммит остаётся за вызывающим кодом
+    """
+    if not key:
+        return
+    now = datetime.now(timezone.utc)
+    ttl = LOOKUP_CACHE_TTL if result_url else LOOKUP_CACHE_NEGATIVE_TTL
+    values = {
+        "result_url": result_url,
+        "evidence": evidence,
+        "checked_at": now,
+        "expires_at": now + timedelta(seconds=ttl),
+    }
+    stmt = insert(LookupCache).values(source=source, key=key, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LookupCache.source, LookupCache.key],
+        set_={column: stmt.excluded[column] for column in values},
+    )
+    await db.execute(stmt)
+
+
+async def purge_expired_lookups(db: AsyncSession) -> int:
+    """Удаляет истёкшие результаты проверок. Коммит остаётся за вызывающим кодом"""
+    result = await db.execute(delete(LookupCache).where(LookupCache.expires_at <= func.now()))
+    return result.rowcount
@@ -0,0 +1,119 @@
+import logging
+import random
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from utils.config import LOG_CLIENT_SAMPLE_RATE
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS текущего процесса за всё время его работы (МБ)"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На Linux ru_maxrss в килобайтах, на macOS — в байтах
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+class PipelineMetrics:
+    """
+    Замеры этапов обработки отчёта: время, процессорное время, количество
+    строк и пиковый RSS процесса. Повторные замеры одного этапа (например,
+    чтение пачками) суммируются в один span.
+
+    CPU — time.process_time всего процесса: в процессе-воркере это время
+    самого этапа, в API оно включает работу соседних корутин.
+    Результат (to_list) сериализуется в JSON, поэтому замеры из воркера
+    передаются в API вместе с записями клиентов и объединяются через merge
+    """
+
+    def __init__(self):
+        self._spans: Dict[str, Dict[str, Any]] = {}
+
+    def _span(self, stage: str) -> Dict[str, Any]:
+        return self._spans.setdefault(stage, {
+            "stage": stage,
+            "wall_seconds": 0.0,
+            "cpu_seconds": 0.0,
+            "rows": 0,
+            "calls": 0,
+            "peak_rss_mb": 0.0,
+        })
+
+    def add(self, stage: str, wall: float, cpu: float, rows: Optional[int] = None) -> None:
+        span = self._span(stage)
+        span["wall_seconds"] += wall
+        span["cpu_seconds"] += cpu
+        span["rows"] += rows or 0
+        span["calls"] += 1
+        span["peak_rss_mb"] = max(span["peak_rss_mb"], peak_rss_mb())
+
+    @contextmanager
+    def stage(self, stage: str, rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Замеряет блок кода. Количество строк можно передать сразу
+        или задать внутри блока: with metrics.stage("parse") as span: span["rows"] = n
+        """
+        span = {"rows": rows}
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield span
+        finally:
+            self.add(stage, time.perf_counter() - wall, time.process_time() - cpu, span["rows"])
+
+    def iterate(self, stage: str, chunks: Iterable[List[Any]]) -> Iterator[List[Any]]:
+        """
+        Отдаёт пачки из chunks, замеряя только время их получения
+        (чтение файла), но не обработку пачек вызывающим кодом
+        """
+        iterator = iter(chunks)
+        while True:
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - wall, time.process_time() - cpu)
+                return
+            self.add(stage, time.perf_counter() - wall, time.process_time() - cpu, len(chunk))
+            yield chunk
+
+    def merge(self, spans: Optional[List[Dict[str, Any]]]) -> None:
+        """Добавляет замеры, полученные из другого процесса (см. to_list)"""
+        for span in spans or []:
+            stage = self._span(span["stage"])
+            stage["wall_seconds"] += span["wall_seconds"]
+            stage["cpu_seconds"] += span["cpu_seconds"]
+            stage["rows"] += span["rows"]
+            stage["calls"] += span["calls"]
+            stage["peak_rss_mb"] = max(stage["peak_rss_mb"], span["peak_rss_mb"])
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Замеры этапов в порядке их первого запуска, с округлением для JSON"""
+        return [
+            {
+                **span,
+                "wall_seconds": round(span["wall_seconds"], 4),
+                "cpu_seconds": round(span["cpu_seconds"], 4),
+                "peak_rss_mb": round(span["peak_rss_mb"], 1),
+                "rows_per_sec": round(span["rows"] / span["wall_seconds"], 1)
+                if span["rows"] and span["wall_seconds"] > 0 else None,
+            }
+            for span in self._spans.values()
+        ]
+
+
+def log_client_sampled(log: logging.Logger, message: str) -> None:
+    """
+    Отладочный лог по отдельному клиенту. Пишется только на уровне DEBUG
+    и только для доли LOG_CLIENT_SAMPLE_RATE клиентов, чтобы построчные
+    сообщения не замедляли обработку больших отчётов
+    """
+    if LOG_CLIENT_SAMPLE_RATE > 0 and log.isEnabledFor(logging.DEBUG) and random.random() < LOG_CLIENT_SAMPLE_RATE:
+        log.debug(message)
@@ -1,11 +1,13 @@
 from enum import Enum
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import DateTime, Table, Column, MetaData, ForeignKey, UUID, String
+from sqlalchemy import DateTime, Table, Column, MetaData, ForeignKey, UUID, String, Index, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy import BigInteger, Text, CHAR, Boolean, Integer, Float, ARRAY, JSON
 from sqlalchemy import Enum as SQLAlchemyEnum
 
+from utils.frod_queue import FROD_PENDING_STATE
+
 # Базовый класс для всех моделей
 class Base(DeclarativeBase):
     pass
@@ -29,6 +31,11 @@ class Report(Base): # отчет
     staff_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), nullable=True)# id пользователя
     is_ready: Mapped[bool] = mapped_column(Boolean, default=False)# готов ли отчет
     all_count: Mapped[int] = mapped_column(Integer, nullable=True) # Сколько всего клиентов в отчёте?
+    commercial_count: Mapped[int] = mapped_column(Integer, nullable=True) # сколько коммерческих клиентов
+    residential_count: Mapped[int] = mapped_column(Integer, nullable=True) # сколько бытовых клиентов
+    total_area: Mapped[float] = mapped_column(Float, nullable=True) # суммарная площадь (м2)
+    total_consumption: Mapped[float] = mapped_column(Float, nullable=True) # суммарное потребление (кВт⋅ч)
+    stats_updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True) # когда пересчитана статистика
     
     # Отношения
     staff: Mapped["User"] = relationship("User", back_populates="reports") # пользователь, который создал отчет
@@ -38,8 +45,44 @@ class File(Base): # загруженный файл
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True) # id файла
     is_parsed: Mapped[bool] = mapped_column(Boolean, default=False) # был ли ранее обработан
+    parsed_rows: Mapped[int] = mapped_column(Integer, default=0, server_default="0") # сколько клиентов файла уже записано (точка возобновления)
     report_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("reports.id")) # id отчета
     s3_url: Mapped[str] = mapped_column(Text) # url файла в s3
+    sha256: Mapped[str] = mapped_column(Text, nullable=True) # SHA-256 содержимого файла (hex)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=True) # размер файла в байтах
+
+class ReportJob(Base): # задача проверки отчёта
+    __tablename__ = "report_jobs"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True, autoincrement=True) # id задачи
+    report_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("reports.id"), index=True) # id отчета
+    status: Mapped[str] = mapped_column(Text, default="queued") # queued / running / done / failed
+    stage: Mapped[str] = mapped_column(Text, nullable=True) # текущий этап обработки
+    timeout: Mapped[int] = mapped_column(Integer, nullable=True) # таймаут обработки одного файла (сек)
+    files_total: Mapped[int] = mapped_column(Integer, default=0) # сколько файлов нужно обработать
+    files_processed: Mapped[int] = mapped_column(Integer, default=0) # сколько файлов обработано
+    bytes_total: Mapped[int] = mapped_column(BigInteger, default=0) # суммарный размер файлов
+    bytes_processed: Mapped[int] = mapped_column(BigInteger, default=0) # размер обработанных файлов
+    rows_total: Mapped[int] = mapped_column(Integer, default=0) # сколько клиентов найдено в файлах
+    rows_processed: Mapped[int] = mapped_column(Integer, default=0) # сколько клиентов записано в БД
+    result: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=True) # итоговая статистика
+    metrics: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=True) # замеры этапов по файлам и по отчету
+    error: Mapped[str] = mapped_column(Text, nullable=True) # текст ошибки
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)) # когда поставлена в очередь
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True) # когда начата
+    finished_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True) # когда завершена
+
+    __table_args__ = (
+        # Не больше одной незавершённой задачи на отчет (статусы из ACTIVE_JOB_STATUSES
+        # в data_cleaning.report_check): два одновременных запроса на проверку
+        # не создадут две задачи, обрабатывающие одни и те же файлы
+        Index(
+            "ux_report_jobs_active",
+            "report_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
 
 class Client(Base): # клиент
     __tablename__ = "clients"
@@ -49,6 +92,8 @@ class Client(Base): # клиент
     email: Mapped[str] = mapped_column(Text, nullable=True) # email клиента   
     phone: Mapped[str] = mapped_column(Text, nullable=True) # телефон клиента 
     address: Mapped[str] = mapped_column(Text, nullable=True) # адрес клиента
+    region: Mapped[str] = mapped_column(Text, nullable=True, index=True) # регион из нормализованного адреса
+    building_key: Mapped[str] = mapped_column(Text, nullable=True, index=True) # нормализованный адрес здания без квартиры
     is_commercial: Mapped[bool] = mapped_column(Boolean, nullable=True, default=False) # коммерческий клиент
     home_type: Mapped[str] = mapped_column(Text, nullable=True) # тип дома
     home_area: Mapped[float] = mapped_column(Float, nullable=True) # площадь дома м2
@@ -68,5 +113,48 @@ class Client(Base): # клиент
     frod_yandex: Mapped[str] = mapped_column(Text, nullable=True) # Яндекс ссылка на объект
     frod_avito: Mapped[str] = mapped_column(Text, nullable=True) # Авито ссылка на объект
     frod_2gis: Mapped[str] = mapped_column(Text, nullable=True) # 2GIS ссылка на объект
+    frod_lease_owner: Mapped[str] = mapped_column(Text, nullable=True) # воркер, который сейчас проверяет клиента
+    frod_lease_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True) # до какого времени клиент закреплён за воркером
+    
+    report_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("reports.id"), nullable=True, index=True) # id отчета, из которого добавлен клиент
+    content_hash: Mapped[int] = mapped_column(BigInteger, nullable=True) # хэш разобранных полей клиента для пропуска неизменившихся строк
+
+    __table_args__ = (
+        # Частичный индекс по очереди проверки на фрод: выборка ожидающих клиентов
+        # не сканирует таблицу, а пустая очередь почти ничего не стоит
+        Index("ix_clients_frod_pending", "id", postgresql_where=text(f"frod_state = '{FROD_PENDING_STATE}'")),
+    )
+
+class ClientConsumption(Base): # помесячное потребление клиента, только последний загруженный ряд (как и в clients)
+    __tablename__ = "clients_consumption"
+    
+    client_id: Mapped[int] = mapped_column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True) # id клиента
+    report_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("reports.id"), index=True) # id отчета, из которого взят последний ряд
+    month: Mapped[str] = mapped_column(Text, primary_key=True) # месяц (ключ из consumption в исходном файле)
+    value: Mapped[float] = mapped_column(Float) # потребление за месяц (кВт⋅ч)
+
+class ImputationStat(Base): # накопленная статистика для заполнения пропусков
+    __tablename__ = "imputation_stats"
+    
+    home_type: Mapped[str] = mapped_column(Text, primary_key=True) # тип дома, '*' — любой
+    region: Mapped[str] = mapped_column(Text, primary_key=True) # регион, '*' — любой
+    field: Mapped[str] = mapped_column(Text, primary_key=True) # заполняемое поле клиента
+    value_sum: Mapped[float] = mapped_column(Float, default=0) # сумма известных значений
+    value_count: Mapped[int] = mapped_column(BigInteger, default=0) # количество известных значений
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)) # когда обновлена
+
+class ImputationSource(Base): # файл, уже учтённый в статистике заполнения
+    __tablename__ = "imputation_sources"
+    
+    source: Mapped[str] = mapped_column(Text, primary_key=True) # SHA-256 файла (или его URL)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)) # когда учтён
+
+class LookupCache(Base): # результат внешней проверки адреса (2GIS, Авито, Яндекс)
+    __tablename__ = "lookup_cache"
     
-    report_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("reports.id"), nullable=True) # id отчета, из которого добавлен клиент
\ No newline at end of file
+    source: Mapped[str] = mapped_column(Text, primary_key=True) # источник: 2gis, avito, yandex
+    key: Mapped[str] = mapped_column(Text, primary_key=True) # нормализованный адрес здания (building_key)
+    result_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True) # найденная ссылка, NULL — ничего не найдено
+    evidence: Mapped[Optional[str]] = mapped_column(Text, nullable=True) # чем подтверждён результат (фраза, адрес объявления)
+    checked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)) # когда проверен
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True) # до какого момента результат действителен
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ReportProcessPool:
+    """
+    Пул процессов для тяжёлой CPU-работы (парсинг отчётов).
+
+    В отличие от run_in_executor(None, ...) работа идёт вне процесса API
+    и не конкурирует с ним за GIL, а таймаут действительно останавливает
+    вычисление: зависший воркер убивается, пул пересоздаётся. Воркеры
+    перезапускаются после max_tasks_per_child задач, чтобы не копить память.
+    """
+
+    def __init__(self, max_workers: int, max_tasks_per_child: Optional[int] = None):
+        self._max_workers = max_workers
+        self._max_tasks_per_child = max_tasks_per_child
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self._max_tasks_per_child,
+            )
+            logger.info(f"Запущен пул процессов: воркеров {self._max_workers}, задач на воркер {self._max_tasks_per_child}")
+        return self._executor
+
+    def _kill(self, executor: ProcessPoolExecutor) -> None:
+        """
+        Убивает все процессы пула. У ProcessPoolExecutor нет публичного способа
+        прервать одну задачу, поэтому останавливаем пул целиком и создаём новый
+        """
+        if self._executor is executor:
+            self._executor = None
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning(f"Пул процессов остановлен, убито воркеров: {len(processes)}")
+
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Выполняет func(*args) в процессе пула. По таймауту воркер убивается
+        и выбрасывается asyncio.TimeoutError
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        retried = False
+        while True:
+            executor = self._get_executor()
+            future = executor.submit(func, *args)
+            remaining = max(deadline - loop.time(), 0) if deadline is not None else None
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+            except asyncio.TimeoutError:
+                self._kill(executor)
+                raise
+            except BrokenProcessPool:
+                # Пул могли остановить из-за таймаута соседней задачи —
+                # тогда один раз перезапускаем нашу задачу в новом пуле
+                if retried or self._executor is executor:
+                    raise
+                retried = True
+                logger.info("Пул процессов был перезапущен, повторный запуск задачи")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
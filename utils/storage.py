@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from typing import Tuple
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 МБ
+
+
+def _write_chunk(buffer, digest, chunk: bytes) -> None:
+    # hashlib и запись в файл отпускают GIL, поэтому поток не мешает event loop
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+async def save_upload(upload: UploadFile, file_path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[str, int]:
+    """
+    Сохраняет загруженный файл на диск кусками по chunk_size байт,
+    попутно считая SHA-256 и размер. Вся файловая работа идёт в потоках,
+    память на загрузку не зависит от размера файла. Файл сначала пишется
+    во временный и переименовывается только после успешной записи.
+
+    Returns:
+        (sha256 в hex, размер в байтах)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = f"{file_path}.part"
+    buffer = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        while chunk := await upload.read(chunk_size):
+            await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+            size += len(chunk)
+        await asyncio.to_thread(buffer.close)
+        await asyncio.to_thread(os.replace, tmp_path, file_path)
+    except BaseException:
+        await asyncio.to_thread(buffer.close)
+        if os.path.exists(tmp_path):
+            await asyncio.to_thread(os.remove, tmp_path)
+        raise
+    return digest.hexdigest(), size
+
+
+async def store_upload_blob(upload: UploadFile, directory: str, extension: str) -> Tuple[str, str, int]:
+    """
+    Сохраняет загрузку как blob, адресуемый содержимым: имя файла — это
+    SHA-256 содержимого. Повторная загрузка того же файла (в любой отчёт)
+    не занимает место на диске, а его колоночный кэш переиспользуется.
+
+    Returns:
+        (имя файла в directory, sha256 в hex, размер в байтах)
+    """
+    tmp_path = os.path.join(directory, f".upload_{uuid.uuid4().hex}")
+    sha256, size = await save_upload(upload, tmp_path)
+    filename = f"{sha256}.{extension}"
+    file_path = os.path.join(directory, filename)
+    if await asyncio.to_thread(os.path.exists, file_path):
+        # Такой файл уже загружали — оставляем существующий blob
+        await asyncio.to_thread(os.remove, tmp_path)
+    else:
+        await asyncio.to_thread(os.replace, tmp_path, file_path)
+    return filename, sha256, size